@@ -0,0 +1,19 @@
+"""
+Benchmarks de la API. Se ejecutan desde la raiz del repo contra una base de datos
+solo para benchmarks, la de BENCH_DATABASE_URL (sqlite o postgres):
+
+    python -m benchmarks seed --reset --users 1000 --characters 5000 --planets 500 --favorites 100000
+    python -m benchmarks run --mode client --requests 200 --out results.json
+    python -m benchmarks run --mode http --url http://localhost:3000 --concurrency 16 --out http.json
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks micro serialization
+
+Ver benchmarks/README.md.
+"""
+import os
+import sys
+
+# La app usa imports planos (from models import ...), como gunicorn con --chdir ./src/
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
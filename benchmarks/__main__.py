@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de la API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="Sembrar la base de datos de BENCH_DATABASE_URL")
+    seed.add_argument("--users", type=int, default=100)
+    seed.add_argument("--characters", type=int, default=1000)
+    seed.add_argument("--planets", type=int, default=200)
+    seed.add_argument("--favorites", type=int, default=10000)
+    seed.add_argument("--skew", type=float, default=1.1, help="Exponente Zipf de la popularidad de los items")
+    seed.add_argument("--seed", type=int, default=42)
+    seed.add_argument("--reset", action="store_true", help="Borrar antes los datos existentes")
+
+    run = commands.add_parser("run", help="Medir todas las rutas (o las indicadas)")
+    run.add_argument("--mode", choices=("client", "http"), default="client")
+    run.add_argument("--url", default="http://127.0.0.1:3000")
+    run.add_argument("--requests", type=int, default=100, help="Peticiones medidas por escenario")
+    run.add_argument("--concurrency", type=int, default=8, help="Hilos en modo http")
+    run.add_argument("--warmup", type=int, default=5)
+    run.add_argument("--only", nargs="*", help="Nombres de escenario o endpoint")
+    run.add_argument("--out", help="Fichero JSON de resultados")
+
+    compare = commands.add_parser("compare", help="Comparar dos ficheros de resultados")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold", type=float, default=0.2, help="Aumento relativo de p95 tolerado")
+
+    micro = commands.add_parser("micro", help="Benchmarks puntuales")
+    micro.add_argument("name", choices=("batch_vs_single", "auth", "favorites_lookup", "search",
+                                        "serialization", "catalog_snapshot", "sync_vs_async"))
+    micro.add_argument("--url")
+    micro.add_argument("--requests", type=int)
+    micro.add_argument("--concurrency")
+    micro.add_argument("--rows", type=int)
+    micro.add_argument("--samples", type=int)
+    micro.add_argument("--workers", type=int)
+    micro.add_argument("--threads", type=int)
+    micro.add_argument("--out")
+
+    startup = commands.add_parser("startup", help="Tiempo de importacion de un worker (python -X importtime)")
+    startup.add_argument("--module", default="wsgi", help="Modulo de entrada en src/ (wsgi, asgi, app)")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=15, help="Paquetes mas lentos a listar")
+    startup.add_argument("--baseline", help="Resultado previo con el que comparar")
+    startup.add_argument("--threshold", type=float, default=0.2, help="Aumento relativo tolerado")
+    startup.add_argument("--max-ms", type=float, help="Limite absoluto del tiempo de importacion")
+    startup.add_argument("--out")
+
+    args = parser.parse_args(argv)
+    # El limitador y los caches de la app se configuran al importarla: para medir
+    # throughput el rate limiting va desactivado salvo que se pida lo contrario
+    os.environ.setdefault("RATELIMIT_ENABLED", "false")
+
+    if args.command not in ("compare", "startup"):
+        # seed y run escriben (y con --reset borran) en la base de datos: nunca en la
+        # de DATABASE_URL por accidente, solo en una dedicada que se indique aparte
+        bench_url = os.environ.get("BENCH_DATABASE_URL")
+        if not bench_url:
+            print("Define BENCH_DATABASE_URL con una base de datos solo para benchmarks", file=sys.stderr)
+            return 2
+        os.environ["DATABASE_URL"] = bench_url
+
+    if args.command == "seed":
+        from benchmarks.seed import seed as run_seed
+        try:
+            counts = run_seed(args.users, args.characters, args.planets, args.favorites, args.skew,
+                              args.seed, clear=args.reset)
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+            return 1
+        print(json.dumps(counts))
+        return 0
+
+    if args.command == "compare":
+        from benchmarks.runner import compare as run_compare
+        with open(args.before) as before, open(args.after) as after:
+            lines, regressions = run_compare(json.load(before), json.load(after), args.threshold)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+
+    if args.command == "startup":
+        from benchmarks import startup as run_startup
+        result = run_startup.measure(args.module, args.runs, args.top)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as previous:
+                baseline = json.load(previous)
+        lines, failures = run_startup.check(result, baseline, args.max_ms, args.threshold)
+        write(args.out, json.dumps(result, indent=2, sort_keys=True))
+        print("\n".join(lines), file=sys.stderr)
+        return 1 if failures else 0
+
+    if args.command == "micro":
+        from benchmarks import micro as benchmarks
+        options = {key: value for key, value in vars(args).items() if key not in ("command", "name", "out")}
+        if args.name != "sync_vs_async" and options.get("concurrency"):
+            options["concurrency"] = int(options["concurrency"])
+        output = benchmarks.dump(benchmarks.run(args.name, **options))
+        write(args.out, output)
+        return 0
+
+    from benchmarks import runner, scenarios
+    from app import app
+    ctx = scenarios.Context.from_db()
+    if not ctx.ids["users"] or not ctx.ids["characters"] or not ctx.ids["planets"]:
+        print("La base de datos esta vacia: ejecuta antes python -m benchmarks seed", file=sys.stderr)
+        return 1
+    missing = scenarios.uncovered_endpoints(app)
+    if missing:
+        print(f"Rutas sin escenario: {', '.join(missing)}", file=sys.stderr)
+
+    selected = scenarios.select(args.only)
+    if args.mode == "client":
+        results = runner.run_client(selected, ctx, args.requests, args.warmup)
+    else:
+        results = runner.run_http(selected, ctx, args.url, args.requests, args.concurrency, args.warmup)
+    meta = {"mode": args.mode, "requests": args.requests}
+    if args.mode == "http":
+        meta.update(url=args.url, concurrency=args.concurrency)
+    write(args.out, json.dumps(runner.report(results, **meta), indent=2, sort_keys=True))
+    return 0
+
+
+def write(path, output):
+    if path:
+        with open(path, "w") as out:
+            out.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,429 @@
+import inspect
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.runner import ClientDriver, HttpDriver, percentile
+from benchmarks.seed import PASSWORD
+
+# Benchmarks puntuales de cada optimizacion. Todos devuelven un dict serializable a
+# JSON. Los de volumen (favorites_lookup, search) miden sobre lo que haya sembrado:
+#   python -m benchmarks seed --characters 1000000 --favorites 1000000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timings(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+    }
+
+
+def timed(fn, samples):
+    values = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        values.append(time.perf_counter() - start)
+    return timings(values)
+
+
+def batch_vs_single(rows=2000, batch_size=500):
+    """Filas/segundo creando characters con POST /people frente a POST /people/batch."""
+    from app import app
+    driver = ClientDriver(app)
+    items = [{"name": f"Batch bench {i}", "specie": "Droid"} for i in range(rows)]
+    created = []
+
+    start = time.perf_counter()
+    for item in items:
+        _, data = driver.send("POST", "/people", item)
+        created.append(data["new_character"]["id"])
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        _, data = driver.send("POST", "/people/batch", items[offset:offset + batch_size])
+        created.extend(result["item"]["id"] for result in data["results"])
+    batch = time.perf_counter() - start
+
+    for offset in range(0, len(created), 1000):
+        driver.send("DELETE", "/people/batch", created[offset:offset + 1000])
+    return {
+        "rows": rows,
+        "batch_size": batch_size,
+        "single_rows_per_sec": round(rows / single, 1),
+        "batch_rows_per_sec": round(rows / batch, 1),
+        "speedup": round(single / batch, 1),
+    }
+
+
+def auth_throughput(requests=200, concurrency=8, url=None):
+    """Throughput de /signup y /login y latencia de lecturas durante la rafaga."""
+    from app import app
+    driver = HttpDriver(url) if url else None
+    local = threading.local()
+
+    def get_driver():
+        if driver is not None:
+            return driver
+        if not hasattr(local, "driver"):
+            local.driver = ClientDriver(app)
+        return local.driver
+
+    def run(method, path, body_fn, count):
+        def one(index):
+            start = time.perf_counter()
+            status, _ = get_driver().send(method, path, body_fn(index))
+            return status, time.perf_counter() - start
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(one, range(count)))
+        wall = time.perf_counter() - start
+        return outcomes, wall
+
+    def summary(outcomes, wall):
+        result = timings([elapsed for _, elapsed in outcomes])
+        result["throughput_rps"] = round(len(outcomes) / wall, 1)
+        result["statuses"] = {}
+        for status, _ in outcomes:
+            result["statuses"][str(status)] = result["statuses"].get(str(status), 0) + 1
+        return result
+
+    prefix = f"auth-{int(time.time())}"
+    signup = run("POST", "/signup", lambda i: {"email": f"{prefix}-{i}@bench.local", "password": PASSWORD}, requests)
+
+    # Lecturas en paralelo con una rafaga de logins: el pool de bcrypt no debe bloquearlas
+    reads = []
+    stop = threading.Event()
+
+    def reader():
+        read_driver = HttpDriver(url) if url else ClientDriver(app)
+        while not stop.is_set():
+            start = time.perf_counter()
+            read_driver.send("GET", "/planets?limit=20")
+            reads.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    login_run = run("POST", "/login", lambda i: {"email": f"{prefix}-{i % requests}@bench.local",
+                                                  "password": PASSWORD}, requests)
+    stop.set()
+    thread.join()
+    return {
+        "concurrency": concurrency,
+        "bcrypt_rounds": app.config.get("BCRYPT_ROUNDS"),
+        "signup": summary(*signup),
+        "login": summary(*login_run),
+        "reads_during_login": timings(reads) if reads else None,
+    }
+
+
+def explain(db, statement):
+    from sqlalchemy import text
+    compiled = statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    return [" ".join(str(value) for value in row) for row in db.session.execute(text(prefix + str(compiled)))]
+
+
+def favorites_lookup(samples=2000):
+    """Latencia de las consultas de favoritos por (id_user, item) y por id_user."""
+    import random
+    from sqlalchemy import select, func
+    from app import app
+    from models import db, Favorites
+
+    with app.app_context():
+        total = db.session.scalar(select(func.count(Favorites.id)))
+        pairs = db.session.execute(select(Favorites.id_user, Favorites.id_character)
+                                   .where(Favorites.id_character.isnot(None)).limit(10000)).all()
+        if not pairs:
+            return {"error": "No hay favoritos sembrados"}
+        rng = random.Random(1)
+
+        def by_item():
+            id_user, id_character = rng.choice(pairs)
+            db.session.execute(select(Favorites.id).where(
+                Favorites.id_user == id_user, Favorites.id_character == id_character)).first()
+
+        def by_user():
+            db.session.execute(select(Favorites).where(Favorites.id_user == rng.choice(pairs)[0])).all()
+
+        id_user, id_character = pairs[0]
+        return {
+            "favorites": total,
+            "by_user_and_character": timed(by_item, samples),
+            "by_user": timed(by_user, samples),
+            "plans": {
+                "by_user_and_character": explain(db, select(Favorites.id).where(
+                    Favorites.id_user == id_user, Favorites.id_character == id_character)),
+                "by_user": explain(db, select(Favorites.id).where(Favorites.id_user == id_user)),
+            },
+        }
+
+
+def search(samples=500):
+    """Latencia de /search y de los filtros por prefijo sobre los datos sembrados."""
+    import random
+    from sqlalchemy import select, func
+    from app import app
+    from models import db, Character
+    from benchmarks.seed import FIRST, LAST
+    import search as catalog
+
+    rng = random.Random(1)
+    with app.app_context():
+        backend = catalog.backend()
+        words = [word.lower() for word in FIRST + LAST]
+        return {
+            "characters": db.session.scalar(select(func.count(Character.id))),
+            "backend": backend,
+            "search_people": timed(lambda: catalog.search("people", rng.choice(words)[:4], 20), samples),
+            "search_planets": timed(lambda: catalog.search("planets", rng.choice(words)[:3], 20), samples),
+            "prefix_filter": timed(lambda: catalog.filter_prefix(
+                Character.query, Character, {"name": rng.choice(FIRST)[:3]}).limit(20).all(), samples),
+        }
+
+
+def serialization(rows=10000, repeat=5):
+    """Tiempo de serializar rows characters: ORM + serialize + json estandar frente a
+    filas Core (column_rows) + el proveedor JSON de la app (orjson si esta)."""
+    import json as std_json
+    from app import app
+    from models import db, Character, column_rows
+
+    with app.app_context():
+        def orm_stdlib():
+            items = Character.query.order_by(Character.id).limit(rows).all()
+            return std_json.dumps([item.serialize() for item in items]).encode()
+
+        def core_provider():
+            query, serialize = column_rows(Character.query.order_by(Character.id).limit(rows), Character)
+            return app.json.encode([serialize(row) for row in query])
+
+        def best(fn):
+            values = []
+            for _ in range(repeat):
+                db.session.expunge_all()
+                start = time.perf_counter()
+                fn()
+                values.append(time.perf_counter() - start)
+            return round(min(values) * 1000, 2)
+
+        count = min(rows, Character.query.count())
+        orm_ms, core_ms = best(orm_stdlib), best(core_provider)
+        return {
+            "rows": count,
+            "json_backend": app.json.backend,
+            "orm_serialize_stdlib_ms": orm_ms,
+            "core_rows_provider_ms": core_ms,
+            "per_10k_rows_ms": {
+                "orm_serialize_stdlib": round(orm_ms * 10000 / max(count, 1), 2),
+                "core_rows_provider": round(core_ms * 10000 / max(count, 1), 2),
+            },
+            "speedup": round(orm_ms / core_ms, 2) if core_ms else None,
+        }
+
+
+def catalog_snapshot(rows=100000, samples=2000):
+    """Memoria y coste del snapshot de catalog.py con rows characters sinteticos: bytes
+    retenidos frente a tener las filas como dicts o un dict id -> bytes, tiempo de
+    construccion y latencia de /people, /people?limit=20 y /people/<id> desde el
+    snapshot frente a la vista contra la base de datos."""
+    import gc
+    import random
+    import tracemalloc
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from app import app
+    from cache import cache
+    from catalog import catalog, Snapshot
+    from models import db, Character
+    from benchmarks.seed import FIRST, LAST, SPECIES
+
+    rng = random.Random(1)
+    start_at = datetime(2024, 1, 1)
+    data = [(i, start_at + timedelta(seconds=i),
+             {"id": i, "name": f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}", "specie": rng.choice(SPECIES)})
+            for i in range(1, rows + 1)]
+    version = (f"{rows}:{data[-1][1].isoformat()}", data[-1][1])
+
+    def retained(build):
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return value, round((current - before) / 2 ** 20, 2), round((peak - before) / 2 ** 20, 2)
+
+    def copy_rows():
+        return [dict(item) for _, _, item in data]
+
+    with app.app_context():
+        encode = app.json.encode
+        snapshot, snapshot_mb, snapshot_peak_mb = retained(lambda: Snapshot.build(version, 0, data, encode))
+        _, dicts_mb, _ = retained(copy_rows)
+        _, bytes_dict_mb, _ = retained(lambda: {id: encode(item) for id, _, item in data})
+        build = timed(lambda: Snapshot.build(version, 0, data, encode), 3)
+
+    # Latencia por el test client: snapshot (rows sinteticos) frente a la vista con la
+    # base de datos de DATABASE_URL (sin ResponseCache) y a codificar el listado entero
+    client = app.test_client()
+    ids = [id for id, _, _ in data]
+    enabled, cache_enabled = catalog.enabled, cache.enabled
+    catalog.enabled, cache.enabled = True, False
+    catalog.generations["people"] = snapshot.generation
+    catalog.snapshots["people"] = snapshot
+    try:
+        snapshot_ms = {
+            "by_id": timed(lambda: client.get(f"/people/{rng.choice(ids)}"), samples),
+            "page_20": timed(lambda: client.get(f"/people?limit=20&after={rng.choice(ids)}"), samples),
+            "full_list": timed(lambda: client.get("/people"), max(samples // 100, 5)),
+        }
+        catalog.enabled = False
+        with app.app_context():
+            db_ids = list(db.session.scalars(select(Character.id)))
+        database_ms = {
+            "rows": len(db_ids),
+            "by_id": timed(lambda: client.get(f"/people/{rng.choice(db_ids)}"), samples),
+            "page_20": timed(lambda: client.get(f"/people?limit=20&after={rng.choice(db_ids)}"), samples),
+        } if db_ids else None
+        with app.app_context():
+            encode_full = timed(lambda: app.json.encode([item for _, _, item in data]), max(samples // 100, 5))
+    finally:
+        catalog.enabled, cache.enabled = enabled, cache_enabled
+        catalog.snapshots.pop("people", None)
+
+    return {
+        "rows": rows,
+        "json_backend": app.json.backend,
+        "memory_mb": {
+            "snapshot": snapshot_mb,
+            "snapshot_build_peak": snapshot_peak_mb,
+            "body": round(len(snapshot.body) / 2 ** 20, 2),
+            "index_arrays": round(sum(len(values) * values.itemsize for values in
+                                      (snapshot.ids, snapshot.starts, snapshot.updated)) / 2 ** 20, 2),
+            "rows_as_dicts": dicts_mb,
+            "dict_id_to_bytes": bytes_dict_mb,
+        },
+        "build_ms": build,
+        "snapshot": snapshot_ms,
+        "database": database_ms,
+        "encode_full_list": encode_full,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor no arranco en el puerto {port}")
+
+
+def tree_rss_mb(pid):
+    # RSS del proceso y sus hijos (workers), leido de /proc (solo Linux)
+    pids, total = [pid], 0
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            continue
+    return round(total / 1024, 1)
+
+
+SERVERS = {
+    # Mismo numero de procesos en ambos modos, para comparar a memoria parecida
+    "sync": lambda port, workers, threads: [
+        sys.executable, "-m", "gunicorn", "wsgi", "--chdir", os.path.join(ROOT, "src"),
+        "-w", str(workers), "--threads", str(threads), "-b", f"127.0.0.1:{port}", "--log-level", "warning"],
+    "async": lambda port, workers, threads: [
+        sys.executable, "-m", "uvicorn", "asgi:application", "--app-dir", os.path.join(ROOT, "src"),
+        "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+}
+
+READ_PATHS = ["/people?limit=20", "/planets?limit=20", "/favorite?limit=20"]
+
+
+def sync_vs_async(concurrency="8,32,128", requests=2000, workers=2, threads=4):
+    """Throughput y p99 de lecturas con gunicorn (workers sync con hilos) frente a
+    uvicorn (asgi.py) con el mismo numero de procesos, y la memoria de cada uno."""
+    levels = [int(level) for level in str(concurrency).split(",")]
+    env = dict(os.environ, RATELIMIT_ENABLED="false")
+    results = {}
+    for mode, command in SERVERS.items():
+        port = free_port()
+        server = subprocess.Popen(command(port, workers, threads), env=env, cwd=ROOT)
+        try:
+            wait_for_port(port)
+            driver = HttpDriver(f"http://127.0.0.1:{port}")
+            results[mode] = {"workers": workers, "threads": threads if mode == "sync" else None, "levels": {}}
+            for level in levels:
+                def one(index):
+                    start = time.perf_counter()
+                    status, _ = driver.send("GET", READ_PATHS[index % len(READ_PATHS)])
+                    return status, time.perf_counter() - start
+                with ThreadPoolExecutor(level) as pool:
+                    list(pool.map(one, range(level * 2)))
+                    start = time.perf_counter()
+                    outcomes = list(pool.map(one, range(requests)))
+                    wall = time.perf_counter() - start
+                result = timings([elapsed for _, elapsed in outcomes])
+                result["throughput_rps"] = round(len(outcomes) / wall, 1)
+                result["errors"] = sum(1 for status, _ in outcomes if status != 200)
+                result["rss_mb"] = tree_rss_mb(server.pid)
+                results[mode]["levels"][str(level)] = result
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    return results
+
+
+BENCHMARKS = {
+    "batch_vs_single": batch_vs_single,
+    "auth": auth_throughput,
+    "favorites_lookup": favorites_lookup,
+    "search": search,
+    "serialization": serialization,
+    "catalog_snapshot": catalog_snapshot,
+    "sync_vs_async": sync_vs_async,
+}
+
+
+def run(name, **options):
+    # Cada benchmark recibe solo las opciones de la linea de comandos que acepta
+    fn = BENCHMARKS[name]
+    accepted = inspect.signature(fn).parameters
+    return fn(**{key: value for key, value in options.items() if value is not None and key in accepted})
+
+
+def dump(result):
+    return json.dumps(result, indent=2, sort_keys=True)
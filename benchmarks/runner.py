@@ -0,0 +1,286 @@
+import http.client
+import json
+import os
+import platform
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from benchmarks.seed import bench_email, PASSWORD
+
+# Ejecuta los escenarios contra la app y resume latencia, throughput y SQL por
+# peticion de cada uno. Dos drivers:
+# - client: Flask test client en el mismo proceso (sin red, cuenta las queries)
+# - http: conexiones keep-alive contra un servidor (gunicorn, uvicorn); las queries
+#   salen de la diferencia de /metrics antes y despues de cada escenario
+
+
+def percentile(values, p):
+    # Nearest-rank sobre valores ya ordenados
+    if not values:
+        return None
+    index = max(int(round(p / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(scenario, latencies, statuses, wall, queries=None):
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status not in scenario.expect)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "endpoint": scenario.endpoint,
+        "method": scenario.method,
+        "count": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "queries_per_request": round(queries, 2) if queries is not None else None,
+    }
+
+
+class ClientDriver:
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpDriver:
+    # Una conexion keep-alive por hilo
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.local = threading.local()
+
+    def connection(self):
+        if not hasattr(self.local, "conn"):
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.local.conn = cls(self.host, self.port, timeout=60)
+        return self.local.conn
+
+    def send(self, method, path, body=None, token=None):
+        headers = {"Accept-Encoding": "identity"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            conn = self.connection()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # El servidor cerro la conexion keep-alive: se reintenta una vez con otra
+                conn.close()
+                del self.local.conn
+                if attempt:
+                    raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+def login(driver, index):
+    status, data = driver.send("POST", "/login", {"email": bench_email(index), "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"No se pudo hacer login como {bench_email(index)} ({status}); "
+                           "¿esta sembrada la base de datos y RATELIMIT_ENABLED=false?")
+    return data["access_token"]
+
+
+def execute(scenario, ctx, driver, token, queries=None):
+    # Devuelve (status, segundos, queries); prepare() no cuenta ni en la latencia ni
+    # en las queries. queries es el contador que incrementa el listener del engine.
+    send = lambda method, path, body=None, auth=False: driver.send(method, path, body, token if auth else None)
+    state = scenario.prepare(ctx, send) if scenario.prepare else {}
+    path = scenario.path(ctx, state)
+    body = scenario.body(ctx, state) if scenario.body else None
+    request_token = (state.get("token") or token) if scenario.auth else None
+    before = queries[0] if queries else 0
+    start = time.perf_counter()
+    status, _ = driver.send(scenario.method, path, body, request_token)
+    elapsed = time.perf_counter() - start
+    return status, elapsed, (queries[0] - before) if queries else None
+
+
+def run_client(scenarios, ctx, requests=100, warmup=5, log=print):
+    from sqlalchemy import event
+    from app import app
+    from models import db
+
+    queries = [0]
+    with app.app_context():
+        engine = db.engine
+
+    def count_query(*args):
+        queries[0] += 1
+
+    driver = ClientDriver(app)
+    token = login(driver, 0)
+    results = {}
+    event.listen(engine, "before_cursor_execute", count_query)
+    try:
+        for scenario in scenarios:
+            for _ in range(warmup):
+                execute(scenario, ctx, driver, token)
+            latencies, statuses, total_queries = [], {}, 0
+            started = time.perf_counter()
+            for _ in range(requests):
+                status, elapsed, request_queries = execute(scenario, ctx, driver, token, queries)
+                total_queries += request_queries
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+            wall = time.perf_counter() - started
+            results[scenario.name] = summarize(scenario, latencies, statuses, wall, total_queries / requests)
+            log(format_line(scenario.name, results[scenario.name]))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
+    return results
+
+
+METRIC_LINE = re.compile(r'^db_queries_per_request_(sum|count)\{endpoint="([^"]+)"\} (\S+)$')
+
+
+def scrape_queries(driver):
+    # {endpoint: (sum, count)} de db_queries_per_request en /metrics
+    conn = driver.connection()
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode()
+    totals = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, endpoint, value = match.groups()
+            current = totals.setdefault(endpoint, [0.0, 0.0])
+            current[0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+def run_http(scenarios, ctx, base_url, requests=1000, concurrency=8, warmup=10, log=print):
+    driver = HttpDriver(base_url)
+    # Cada hilo usa un usuario sembrado distinto
+    tokens = [login(driver, index % max(len(ctx.ids["users"]), 1)) for index in range(concurrency)]
+    token_of = {}
+    lock = threading.Lock()
+
+    def thread_token():
+        ident = threading.get_ident()
+        with lock:
+            if ident not in token_of:
+                token_of[ident] = tokens[len(token_of) % len(tokens)]
+            return token_of[ident]
+
+    def worker(scenario, count):
+        latencies, statuses = [], {}
+        token = thread_token()
+        for _ in range(count):
+            status, elapsed, _ = execute(scenario, ctx, driver, token)
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+        return latencies, statuses
+
+    results = {}
+    with ThreadPoolExecutor(concurrency) as pool:
+        for scenario in scenarios:
+            list(pool.map(lambda _: worker(scenario, max(warmup // concurrency, 1)), range(concurrency)))
+            before = scrape_queries(driver)
+            per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0)
+                          for i in range(concurrency)]
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda count: worker(scenario, count), per_thread))
+            wall = time.perf_counter() - started
+            after = scrape_queries(driver)
+
+            latencies = [value for outcome in outcomes for value in outcome[0]]
+            statuses = {}
+            for _, outcome_statuses in outcomes:
+                for status, count in outcome_statuses.items():
+                    statuses[status] = statuses.get(status, 0) + count
+            # Incluye las peticiones de prepare() al mismo endpoint, si las hay
+            old_sum, old_count = before.get(scenario.endpoint, (0.0, 0.0))
+            new_sum, new_count = after.get(scenario.endpoint, (0.0, 0.0))
+            queries = (new_sum - old_sum) / (new_count - old_count) if new_count > old_count else None
+            results[scenario.name] = summarize(scenario, latencies, statuses, wall, queries)
+            log(format_line(scenario.name, results[scenario.name]))
+    return results
+
+
+def format_line(name, result):
+    queries = result["queries_per_request"]
+    return (f"{name:28} n={result['count']:<6} err={result['errors']:<4} "
+            f"p50={result['p50_ms']:>9.3f}ms p95={result['p95_ms']:>9.3f}ms p99={result['p99_ms']:>9.3f}ms "
+            f"{result['throughput_rps']:>9.1f} req/s q/req={queries if queries is not None else '-'}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, **meta):
+    from app import app
+    from models import db
+    from benchmarks.seed import volumes
+    with app.app_context():
+        meta.setdefault("dialect", db.engine.dialect.name)
+        meta.setdefault("volumes", volumes(db))
+    meta.update({
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    })
+    return {"meta": meta, "results": results}
+
+
+def compare(before, after, threshold=0.2, min_ms=0.5):
+    # Regresiones de p95 (relativas, ignorando diferencias por debajo de min_ms) o de
+    # queries por peticion (media query o mas; los hits de cache dan valores fraccionarios)
+    lines, regressions = [], []
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            lines.append(f"{name:28} nuevo")
+            continue
+        flags = []
+        if old["p95_ms"] and new["p95_ms"] is not None:
+            change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"]
+            if change > threshold and new["p95_ms"] - old["p95_ms"] > min_ms:
+                flags.append("p95")
+        else:
+            change = 0.0
+        if (old["queries_per_request"] is not None and new["queries_per_request"] is not None
+                and new["queries_per_request"] >= old["queries_per_request"] + 0.5):
+            flags.append("queries")
+        if new["errors"] > old["errors"]:
+            flags.append("errors")
+        if flags:
+            regressions.append(name)
+        lines.append(f"{name:28} p95 {old['p95_ms']}ms -> {new['p95_ms']}ms ({change:+.1%}) "
+                     f"q/req {old['queries_per_request']} -> {new['queries_per_request']}"
+                     + (f"  REGRESION: {', '.join(flags)}" if flags else ""))
+    return lines, regressions
@@ -0,0 +1,229 @@
+import itertools
+import random
+import threading
+from benchmarks.seed import bench_email, PASSWORD, FIRST, SPECIES
+
+# Un escenario por ruta de src/routes.py. path/body reciben el contexto y el estado
+# devuelto por prepare(), que se ejecuta antes de cada peticion sin medir tiempo
+# (p.ej. crear el character que luego borra DELETE /people/<id>).
+
+
+class Scenario:
+
+    def __init__(self, name, endpoint, method, path, body=None, auth=False, prepare=None, expect=(200,)):
+        self.name = name
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.body = body
+        self.auth = auth
+        self.prepare = prepare
+        self.expect = expect
+
+
+class Context:
+    # Ids existentes en la base de datos sembrada y generador aleatorio por hilo
+
+    def __init__(self, ids, random_seed=1):
+        self.ids = ids
+        self.seed = random_seed
+        self.local = threading.local()
+        self.counter = itertools.count()
+
+    @classmethod
+    def from_db(cls, random_seed=1):
+        from app import app
+        from models import db, User, Character, Planet
+        with app.app_context():
+            ids = {kind: list(db.session.scalars(db.select(model.id).order_by(model.id)))
+                   for kind, model in (("users", User), ("characters", Character), ("planets", Planet))}
+        return cls(ids, random_seed)
+
+    @property
+    def rng(self):
+        if not hasattr(self.local, "rng"):
+            self.local.rng = random.Random(f"{self.seed}-{threading.get_ident()}")
+        return self.local.rng
+
+    def pick(self, kind):
+        return self.rng.choice(self.ids[kind])
+
+    def unique(self, prefix):
+        return f"{prefix}-{next(self.counter)}-{threading.get_ident()}"
+
+    def user_id(self, email):
+        from app import app
+        from models import db, User
+        with app.app_context():
+            return db.session.scalar(db.select(User.id).where(User.email == email))
+
+
+def created_id(data, key):
+    return (data or {}).get(key, {}).get("id")
+
+
+def prepare_character(ctx, send):
+    _, data = send("POST", "/people", {"name": ctx.unique("Bench"), "specie": "Droid"})
+    return {"id": created_id(data, "new_character")}
+
+
+def prepare_planet(ctx, send):
+    _, data = send("POST", "/planets", {"name": ctx.unique("Bench")})
+    return {"id": created_id(data, "new_planet")}
+
+
+def prepare_user(ctx, send):
+    email = ctx.unique("delete") + "@bench.local"
+    send("POST", "/user", {"name": "Bench", "email": email, "password": PASSWORD})
+    return {"id": ctx.user_id(email)}
+
+
+def prepare_favorite(kind, path):
+    def prepare(ctx, send):
+        id = ctx.pick(kind)
+        send("POST", f"{path}/{id}", auth=True)
+        return {"id": id}
+    return prepare
+
+
+def prepare_logout(ctx, send):
+    _, data = send("POST", "/login", {"email": bench_email(0), "password": PASSWORD})
+    return {"token": data["access_token"]}
+
+
+def favorite_targets(ctx, size):
+    return [{"id_character": ctx.pick("characters")} if ctx.rng.random() < 0.7
+            else {"id_planet": ctx.pick("planets")} for _ in range(size)]
+
+
+def prepare_favorite_batch(ctx, send):
+    items = favorite_targets(ctx, 20)
+    send("POST", "/favorite/batch", items, auth=True)
+    return {"items": items}
+
+
+def prepare_batch(path, size, fields):
+    def prepare(ctx, send):
+        items = [{field: ctx.unique("Bench") for field in fields} for _ in range(size)]
+        _, data = send("POST", path, items)
+        return {"ids": [result["item"]["id"] for result in (data or {}).get("results", []) if "item" in result]}
+    return prepare
+
+
+def people_items(ctx, size):
+    return [{"name": ctx.unique("Bench"), "specie": ctx.rng.choice(SPECIES)} for _ in range(size)]
+
+
+def prefix(ctx):
+    return ctx.rng.choice(FIRST)[:3]
+
+
+SCENARIOS = [
+    # Auth
+    Scenario("signup", "api.signup", "POST", lambda ctx, s: "/signup",
+             lambda ctx, s: {"email": ctx.unique("signup") + "@bench.local", "password": PASSWORD},
+             expect=(201,)),
+    Scenario("login", "api.login", "POST", lambda ctx, s: "/login",
+             lambda ctx, s: {"email": bench_email(ctx.rng.randrange(len(ctx.ids["users"]))), "password": PASSWORD}),
+    Scenario("private", "api.private", "GET", lambda ctx, s: "/private", auth=True),
+    Scenario("logout", "api.logout", "POST", lambda ctx, s: "/logout", auth=True, prepare=prepare_logout),
+
+    # Utilidades
+    Scenario("sitemap", "api.sitemap", "GET", lambda ctx, s: "/"),
+    Scenario("cache_stats", "api.cache_stats", "GET", lambda ctx, s: "/cache/stats"),
+    Scenario("metrics", "metrics", "GET", lambda ctx, s: "/metrics"),
+    Scenario("swagger", "swagger", "GET", lambda ctx, s: "/swagger.json"),
+
+    # Users
+    Scenario("get_all_users", "api.get_all_users", "GET", lambda ctx, s: "/users?limit=20"),
+    Scenario("add_new_user", "api.add_new_user", "POST", lambda ctx, s: "/user",
+             lambda ctx, s: {"name": "Bench", "email": ctx.unique("user") + "@bench.local", "password": PASSWORD},
+             expect=(201,)),
+    Scenario("delete_user", "api.delete_user", "DELETE", lambda ctx, s: f"/user/{s['id']}", prepare=prepare_user),
+
+    # Characters
+    Scenario("get_all_people", "api.get_all_people", "GET", lambda ctx, s: "/people?limit=20"),
+    Scenario("get_all_people[full]", "get_all_people", "GET", lambda ctx, s: "/people"),
+    Scenario("get_all_people[name]", "get_all_people", "GET", lambda ctx, s: f"/people?name={prefix(ctx)}&limit=20"),
+    Scenario("get_people", "api.get_people", "GET", lambda ctx, s: f"/people/{ctx.pick('characters')}"),
+    Scenario("add_new_people", "api.add_new_people", "POST", lambda ctx, s: "/people",
+             lambda ctx, s: {"name": ctx.unique("Bench"), "specie": "Human"}, expect=(201,)),
+    Scenario("edit_people", "api.edit_people", "PUT", lambda ctx, s: f"/people/{ctx.pick('characters')}",
+             lambda ctx, s: {"name": ctx.unique("Edited"), "specie": ctx.rng.choice(SPECIES)}),
+    Scenario("delete_people", "api.delete_people", "DELETE", lambda ctx, s: f"/people/{s['id']}",
+             prepare=prepare_character),
+    Scenario("get_people_stats", "api.get_people_stats", "GET",
+             lambda ctx, s: f"/people/{ctx.pick('characters')}/stats"),
+    Scenario("get_top_people", "api.get_top_people", "GET", lambda ctx, s: "/people/top?limit=10"),
+
+    # Planets
+    Scenario("get_all_planets", "api.get_all_planets", "GET", lambda ctx, s: "/planets?limit=20"),
+    Scenario("get_all_planets[full]", "get_all_planets", "GET", lambda ctx, s: "/planets"),
+    Scenario("get_planet", "api.get_planet", "GET", lambda ctx, s: f"/planets/{ctx.pick('planets')}"),
+    Scenario("add_new_planet", "api.add_new_planet", "POST", lambda ctx, s: "/planets",
+             lambda ctx, s: {"name": ctx.unique("Bench")}, expect=(201,)),
+    Scenario("edit_planet", "api.edit_planet", "PUT", lambda ctx, s: f"/planets/{ctx.pick('planets')}",
+             lambda ctx, s: {"name": ctx.unique("Edited")}),
+    Scenario("delete_planet", "api.delete_planet", "DELETE", lambda ctx, s: f"/planets/{s['id']}",
+             prepare=prepare_planet),
+    Scenario("get_top_planets", "api.get_top_planets", "GET", lambda ctx, s: "/planets/top?limit=10"),
+
+    # Favoritos
+    Scenario("get_all_favorites", "api.get_all_favorites", "GET", lambda ctx, s: "/favorite?limit=50"),
+    Scenario("get_all_favorites_user", "api.get_all_favorites_user", "GET",
+             lambda ctx, s: f"/users/{ctx.pick('users')}/favorites", expect=(200, 404)),
+    Scenario("get_user_favorites_count", "api.get_user_favorites_count", "GET",
+             lambda ctx, s: f"/users/{ctx.pick('users')}/favorites/count"),
+    Scenario("is_favorite_people", "api.is_favorite_people", "GET",
+             lambda ctx, s: f"/favorite/people/{ctx.pick('characters')}", auth=True),
+    Scenario("is_favorite_planet", "api.is_favorite_planet", "GET",
+             lambda ctx, s: f"/favorite/planets/{ctx.pick('planets')}", auth=True),
+    Scenario("add_favorit_people", "api.add_favorit_people", "POST",
+             lambda ctx, s: f"/favorite/people/{ctx.pick('characters')}", auth=True, expect=(201, 409)),
+    Scenario("delete_favorite_people", "api.delete_favorite_people", "DELETE",
+             lambda ctx, s: f"/favorite/people/{s['id']}", auth=True,
+             prepare=prepare_favorite("characters", "/favorite/people")),
+    Scenario("add_favorite_planet", "api.add_favorite_planet", "POST",
+             lambda ctx, s: f"/favorite/planets/{ctx.pick('planets')}", auth=True, expect=(200, 409)),
+    Scenario("delete_favorite_peopl", "api.delete_favorite_peopl", "DELETE",
+             lambda ctx, s: f"/favorite/planets/{s['id']}", auth=True,
+             prepare=prepare_favorite("planets", "/favorite/planets")),
+
+    # Busqueda
+    Scenario("search_catalog", "api.search_catalog", "GET", lambda ctx, s: f"/search?q={prefix(ctx)}&limit=20"),
+
+    # Batch (50 elementos por peticion)
+    Scenario("add_people_batch", "api.add_people_batch", "POST", lambda ctx, s: "/people/batch",
+             lambda ctx, s: people_items(ctx, 50), expect=(201,)),
+    Scenario("edit_people_batch", "api.edit_people_batch", "PATCH", lambda ctx, s: "/people/batch",
+             lambda ctx, s: [{"id": ctx.pick("characters"), **item} for item in people_items(ctx, 50)],
+             expect=(200, 207)),
+    Scenario("delete_people_batch", "api.delete_people_batch", "DELETE", lambda ctx, s: "/people/batch",
+             lambda ctx, s: s["ids"], prepare=prepare_batch("/people/batch", 50, ("name", "specie"))),
+    Scenario("add_planets_batch", "api.add_planets_batch", "POST", lambda ctx, s: "/planets/batch",
+             lambda ctx, s: [{"name": ctx.unique("Bench")} for _ in range(50)], expect=(201,)),
+    Scenario("edit_planets_batch", "api.edit_planets_batch", "PATCH", lambda ctx, s: "/planets/batch",
+             lambda ctx, s: [{"id": ctx.pick("planets"), "name": ctx.unique("Edited")} for _ in range(50)],
+             expect=(200, 207)),
+    Scenario("delete_planets_batch", "api.delete_planets_batch", "DELETE", lambda ctx, s: "/planets/batch",
+             lambda ctx, s: s["ids"], prepare=prepare_batch("/planets/batch", 50, ("name",))),
+    Scenario("add_favorites_batch", "api.add_favorites_batch", "POST", lambda ctx, s: "/favorite/batch",
+             lambda ctx, s: favorite_targets(ctx, 20), auth=True, expect=(201, 207, 409)),
+    Scenario("delete_favorites_batch", "api.delete_favorites_batch", "DELETE", lambda ctx, s: "/favorite/batch",
+             lambda ctx, s: s["items"], auth=True, prepare=prepare_favorite_batch, expect=(200, 207)),
+]
+
+
+def select(names=None):
+    if not names:
+        return SCENARIOS
+    wanted = set(names)
+    return [scenario for scenario in SCENARIOS if scenario.name in wanted or scenario.endpoint in wanted]
+
+
+def uncovered_endpoints(app):
+    # Rutas de la app sin escenario (admin y static no se miden)
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()
+                   if rule.endpoint not in covered and rule.endpoint != "static"
+                   and not rule.rule.startswith("/admin")})
@@ -0,0 +1,147 @@
+import random
+import bcrypt
+from itertools import accumulate
+from sqlalchemy import insert, delete, text, inspect
+
+# Dataset sintetico de Star Wars. La popularidad de characters y planets sigue una
+# distribucion Zipf (pocos items acumulan la mayoria de favoritos) y el numero de
+# favoritos por usuario tambien es sesgado, como en trafico real.
+
+SPECIES = ["Human", "Droid", "Wookiee", "Twi'lek", "Rodian", "Hutt", "Gungan", "Zabrak",
+           "Mon Calamari", "Trandoshan", "Ewok", "Jawa", "Togruta", "Kel Dor", "Nautolan"]
+FIRST = ["Luke", "Leia", "Han", "Anakin", "Padme", "Obi-Wan", "Mace", "Ahsoka", "Din", "Cassian",
+         "Jyn", "Poe", "Rey", "Finn", "Kylo", "Qui-Gon", "Ben", "Bail", "Wedge", "Lando", "Boba",
+         "Jango", "Hera", "Kanan", "Ezra", "Sabine", "Cara", "Bo-Katan", "Orson", "Saw"]
+LAST = ["Skywalker", "Organa", "Solo", "Amidala", "Kenobi", "Windu", "Tano", "Djarin", "Andor",
+        "Erso", "Dameron", "Ren", "Jinn", "Antilles", "Calrissian", "Fett", "Syndulla", "Jarrus",
+        "Bridger", "Wren", "Dune", "Kryze", "Krennic", "Gerrera", "Tarkin", "Piett", "Veers"]
+PLANET_PREFIX = ["Tat", "Hoth", "End", "Nab", "Cor", "Kash", "Geon", "Mus", "Mand", "Jak", "Lo",
+                 "Bes", "Dag", "Bespin", "Kam", "Uta", "Fel", "Mygeet", "Sca", "Ilu", "Ord", "Ryl"]
+PLANET_SUFFIX = ["ooine", "or", "oo", "uscant", "yyyk", "onosis", "tafar", "alore", "ku", "thal",
+                 "pin", "obah", "ino", "pau", "ucia", "if", "um", "ara", "oth", "ion", "Mantell"]
+
+PASSWORD = "bench-Password1"
+CHUNK = 10000
+
+
+def character_rows(count, rng):
+    for i in range(count):
+        yield {"name": f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}", "specie": rng.choice(SPECIES)}
+
+
+def planet_rows(count, rng):
+    for i in range(count):
+        yield {"name": f"{rng.choice(PLANET_PREFIX)}{rng.choice(PLANET_SUFFIX)} {i}"}
+
+
+def user_rows(count, password_hash):
+    for i in range(count):
+        yield {"name": f"Bench User {i}", "email": bench_email(i), "password": password_hash, "is_active": True}
+
+
+def bench_email(i):
+    return f"user{i}@bench.local"
+
+
+def zipf_weights(count, skew):
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def favorite_rows(total, users, characters, planets, rng, skew=1.1, planet_share=0.3):
+    # users/characters/planets: listas de (id, name). Cada usuario recibe una parte
+    # de `total` proporcional a su peso Zipf, sin repetir item.
+    if not users or not (characters or planets):
+        return
+    user_weights = zipf_weights(len(users), 0.8)
+    per_user = [0] * len(users)
+    for index in rng.choices(range(len(users)), cum_weights=user_weights, k=total):
+        per_user[index] += 1
+
+    pools = [(tipo, items, zipf_weights(len(items), skew)) for tipo, items in
+             (("character", characters), ("planet", planets)) if items]
+    shares = [1 - planet_share, planet_share] if len(pools) == 2 else [1]
+
+    for (id_user, _), count in zip(users, per_user):
+        seen = set()
+        # Un usuario no puede tener mas favoritos que items hay
+        count = min(count, len(characters) + len(planets))
+        while len(seen) < count:
+            tipo, items, weights = rng.choices(pools, weights=shares)[0]
+            item_id, name = items[rng.choices(range(len(items)), cum_weights=weights)[0]]
+            if (tipo, item_id) in seen:
+                continue
+            seen.add((tipo, item_id))
+            yield {
+                "id_user": id_user,
+                "id_character": item_id if tipo == "character" else None,
+                "id_planet": item_id if tipo == "planet" else None,
+                "name": name,
+                "tipo": tipo,
+            }
+
+
+def insert_chunks(db, model, rows):
+    chunk, inserted = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            db.session.execute(insert(model), chunk)
+            inserted += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+        inserted += len(chunk)
+    db.session.commit()
+    return inserted
+
+
+def reset(db):
+    from models import User, Character, Planet, Favorites, FavoriteCounter
+    for model in (FavoriteCounter, Favorites, User, Character, Planet):
+        db.session.execute(delete(model))
+    db.session.commit()
+
+
+def seed(users=100, characters=1000, planets=200, favorites=10000, skew=1.1,
+         random_seed=42, clear=False, log=print):
+    from app import app
+    from models import db, User, Character, Planet, Favorites, rebuild_favorite_counters
+
+    rng = random.Random(random_seed)
+    with app.app_context():
+        # Con la base migrada (flask db upgrade) esto no hace nada; sin migrar crea las
+        # tablas pero no los indices de busqueda de la migracion c5b2f8e19a03
+        db.create_all()
+        if clear:
+            reset(db)
+        elif db.session.query(User.id).filter_by(email=bench_email(0)).first() is not None:
+            raise RuntimeError("La base de datos ya esta sembrada: usa --reset para borrarla y volver a sembrar")
+
+        # Todos los usuarios comparten contraseña; un solo hash con pocas rondas
+        password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+        log(f"users: {insert_chunks(db, User, user_rows(users, password_hash))}")
+        log(f"characters: {insert_chunks(db, Character, character_rows(characters, rng))}")
+        log(f"planets: {insert_chunks(db, Planet, planet_rows(planets, rng))}")
+
+        user_ids = db.session.execute(db.select(User.id, User.email).order_by(User.id)).all()
+        character_ids = db.session.execute(db.select(Character.id, Character.name).order_by(Character.id)).all()
+        planet_ids = db.session.execute(db.select(Planet.id, Planet.name).order_by(Planet.id)).all()
+        rows = favorite_rows(favorites, user_ids, character_ids, planet_ids, rng, skew)
+        log(f"favorites: {insert_chunks(db, Favorites, rows)}")
+
+        rebuild_favorite_counters()
+        # Estadisticas frescas para que el planner use los indices con el volumen nuevo
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        return volumes(db)
+
+
+def volumes(db):
+    from models import User, Character, Planet, Favorites
+    return {model.__tablename__: db.session.query(model).count()
+            for model in (User, Character, Planet, Favorites)}
+
+
+def has_search_index(db):
+    tables = set(inspect(db.engine).get_table_names())
+    return {"character_fts", "planet_fts"} <= tables or db.engine.dialect.name == "postgresql"
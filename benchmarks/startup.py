@@ -0,0 +1,98 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Tiempo de arranque de un worker: importa el modulo de entrada (wsgi por defecto)
+# en un proceso nuevo con `python -X importtime` y agrega el tiempo propio de cada
+# paquete. Sirve de guardia en CI: falla si se cargan al arrancar modulos que deben
+# ser perezosos o si el tiempo de importacion empeora respecto a un resultado previo.
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Solo se importan bajo demanda en el proceso web (ADMIN_MODE, MIGRATE_ENABLED, /swagger.json)
+DEFERRED = ("flask_admin", "wtforms", "flask_migrate", "alembic", "flask_swagger")
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package", la sangria es la profundidad
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(own), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+    return rows
+
+
+def import_once(module):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=SRC, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} fallo:\n{proc.stderr[-2000:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def interpreter_ms(runs):
+    values = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        values.append(time.perf_counter() - start)
+    return round(statistics.median(values) * 1000, 1)
+
+
+def measure(module="wsgi", runs=5, top=15):
+    import_once(module)  # calienta los .pyc para no medir la compilacion
+    walls, totals, counts, packages = [], [], [], {}
+    for _ in range(runs):
+        wall, rows = import_once(module)
+        walls.append(wall)
+        counts.append(len(rows))
+        totals.append(next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0))
+        run_packages = {}
+        for name, own, _, _ in rows:
+            root = name.split(".")[0]
+            run_packages[root] = run_packages.get(root, 0) + own
+        for root, own in run_packages.items():
+            packages.setdefault(root, []).append(own)
+
+    by_package = sorted(((root, statistics.median(values) / 1000) for root, values in packages.items()),
+                        key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "interpreter_ms": interpreter_ms(runs),
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "modules": int(statistics.median(counts)),
+        "top_packages": [[root, round(ms, 1)] for root, ms in by_package[:top]],
+        "packages": sorted(packages),
+        "deferred_loaded": [name for name in DEFERRED if name in packages],
+    }
+
+
+def check(result, baseline=None, max_ms=None, threshold=0.2, min_ms=20):
+    # Devuelve (lineas, fallos) como runner.compare
+    lines = [f"{result['module']}: import {result['import_ms']}ms, wall {result['wall_ms']}ms "
+             f"(interprete {result['interpreter_ms']}ms), {result['modules']} modulos"]
+    failures = []
+    if result["deferred_loaded"]:
+        failures.append(f"importados al arrancar: {', '.join(result['deferred_loaded'])}")
+    if max_ms is not None and result["import_ms"] > max_ms:
+        failures.append(f"import {result['import_ms']}ms > {max_ms}ms")
+    if baseline is not None:
+        old, new = baseline["import_ms"], result["import_ms"]
+        change = (new - old) / old if old else 0.0
+        lines.append(f"baseline: import {old}ms -> {new}ms ({change:+.1%})")
+        if change > threshold and new - old > min_ms:
+            failures.append(f"import {change:+.1%} respecto al baseline")
+        added = sorted(set(result["packages"]) - set(baseline["packages"]))
+        if added:
+            lines.append(f"paquetes nuevos al arrancar: {', '.join(added)}")
+    lines.extend(f"REGRESION: {failure}" for failure in failures)
+    return lines, failures
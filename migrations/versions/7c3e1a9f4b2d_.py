@@ -0,0 +1,29 @@
+"""add updated_at to character, planet and favorites
+
+Revision ID: 7c3e1a9f4b2d
+Revises: 55697251ab97
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e1a9f4b2d'
+down_revision = '55697251ab97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('character', 'planet', 'favorites'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(),
+                                          server_default=sa.func.now(), nullable=False))
+
+
+def downgrade():
+    for table in ('favorites', 'planet', 'character'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,46 @@
+"""indexes and partial unique constraints on favorites
+
+Revision ID: a41d6e0c8f17
+Revises: 7c3e1a9f4b2d
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d6e0c8f17'
+down_revision = '7c3e1a9f4b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Quitar duplicados previos (se conserva el mas antiguo) para poder crear los indices unicos
+    op.execute("""
+        DELETE FROM favorites WHERE id_character IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM favorites WHERE id_character IS NOT NULL GROUP BY id_user, id_character)
+    """)
+    op.execute("""
+        DELETE FROM favorites WHERE id_planet IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM favorites WHERE id_planet IS NOT NULL GROUP BY id_user, id_planet)
+    """)
+
+    op.create_index('ix_favorites_id_user', 'favorites', ['id_user'])
+    op.create_index('ix_favorites_id_character', 'favorites', ['id_character'])
+    op.create_index('ix_favorites_id_planet', 'favorites', ['id_planet'])
+    op.create_index('uq_favorites_user_character', 'favorites', ['id_user', 'id_character'], unique=True,
+                    postgresql_where=sa.text('id_character IS NOT NULL'),
+                    sqlite_where=sa.text('id_character IS NOT NULL'))
+    op.create_index('uq_favorites_user_planet', 'favorites', ['id_user', 'id_planet'], unique=True,
+                    postgresql_where=sa.text('id_planet IS NOT NULL'),
+                    sqlite_where=sa.text('id_planet IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('uq_favorites_user_planet', table_name='favorites')
+    op.drop_index('uq_favorites_user_character', table_name='favorites')
+    op.drop_index('ix_favorites_id_planet', table_name='favorites')
+    op.drop_index('ix_favorites_id_character', table_name='favorites')
+    op.drop_index('ix_favorites_id_user', table_name='favorites')
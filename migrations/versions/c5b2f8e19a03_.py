@@ -0,0 +1,66 @@
+"""search indexes for character and planet
+
+Revision ID: c5b2f8e19a03
+Revises: a41d6e0c8f17
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5b2f8e19a03'
+down_revision = 'a41d6e0c8f17'
+branch_labels = None
+depends_on = None
+
+# Tablas FTS5 (sqlite) con external content, sincronizadas por triggers
+FTS_TABLES = {
+    'character_fts': ('character', ('name', 'specie')),
+    'planet_fts': ('planet', ('name',)),
+}
+
+TRGM_INDEXES = {
+    'ix_character_name_trgm': ('character', 'name'),
+    'ix_character_specie_trgm': ('character', 'specie'),
+    'ix_planet_name_trgm': ('planet', 'name'),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index, (table, column) in TRGM_INDEXES.items():
+            op.execute(f'CREATE INDEX {index} ON "{table}" USING gin ({column} gin_trgm_ops)')
+
+    elif dialect == 'sqlite':
+        for fts, (table, columns) in FTS_TABLES.items():
+            cols = ', '.join(columns)
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+            op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+                       f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')")
+            op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                       f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END")
+            op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END")
+            op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+                       f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END")
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        for index in TRGM_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {index}')
+
+    elif dialect == 'sqlite':
+        for fts in FTS_TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
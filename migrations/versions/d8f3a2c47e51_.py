@@ -0,0 +1,38 @@
+"""denormalized favorite counters
+
+Revision ID: d8f3a2c47e51
+Revises: c5b2f8e19a03
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3a2c47e51'
+down_revision = 'c5b2f8e19a03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('favorite_counters',
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tipo', 'item_id')
+    )
+    op.create_index('ix_favorite_counters_tipo_count', 'favorite_counters', ['tipo', 'count'])
+
+    # Backfill desde los favoritos existentes
+    for tipo, column in (('user', 'id_user'), ('character', 'id_character'), ('planet', 'id_planet')):
+        op.execute(f"""
+            INSERT INTO favorite_counters (tipo, item_id, count)
+            SELECT '{tipo}', {column}, COUNT(id) FROM favorites WHERE {column} IS NOT NULL GROUP BY {column}
+        """)
+
+
+def downgrade():
+    op.drop_index('ix_favorite_counters_tipo_count', table_name='favorite_counters')
+    op.drop_table('favorite_counters')
@@ -1,10 +1,14 @@
 import os
-from flask_admin import Admin
+import threading
+from flask import Flask
 from models import db, User, Character, Planet, Favorites
-from flask_admin.contrib.sqla import ModelView
 
 
 def setup_admin(app):
+    # flask_admin (y wtforms) solo se importan si se monta el admin
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
+
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
     admin = Admin(app, name='4Geeks Admin', template_mode='bootstrap3')
@@ -17,3 +21,41 @@ def setup_admin(app):
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
+
+
+class LazyAdmin:
+    # Middleware WSGI que sirve /admin desde una app Flask aparte creada en la primera
+    # peticion. Flask no admite registrar rutas despues de servir la primera peticion,
+    # asi que el admin no puede anadirse tarde a la app principal.
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.admin_app = None
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == '/admin' or path.startswith('/admin/'):
+            return self.get_admin_app()(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+    def get_admin_app(self):
+        if self.admin_app is None:
+            with self._lock:
+                if self.admin_app is None:
+                    admin_app = Flask(self.app.import_name)
+                    admin_app.config.from_mapping(self.app.config)
+                    db.init_app(admin_app)
+                    setup_admin(admin_app)
+                    self.admin_app = admin_app
+        return self.admin_app
+
+
+def mount_admin(app):
+    # ADMIN_MODE: eager (al arrancar), lazy (en la primera peticion a /admin) u off
+    mode = app.config['ADMIN_MODE']
+    if mode == 'eager':
+        setup_admin(app)
+    elif mode == 'lazy':
+        app.wsgi_app = LazyAdmin(app)
@@ -0,0 +1,356 @@
+"""
+Punto de entrada ASGI: las lecturas de characters, planets y favorites se sirven con
+una AsyncSession (asyncpg / aiosqlite) sin ocupar un hilo mientras se espera a la base
+de datos; el resto de la API (escrituras, auth, admin, parametros no soportados aqui)
+pasa tal cual a la app Flask.
+
+    uvicorn asgi:application --app-dir src
+"""
+import os
+import re
+import time
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from werkzeug.wrappers import Request
+from wsgi import application as flask_app
+from cache import cache, user_favorites
+from catalog import catalog
+from compression import compress
+from replicas import replicas, db_reads_routed_total
+from metrics import http_requests_total, http_request_duration, http_response_size
+from models import User, Character, Planet, Favorites, resource_version_select, collection_version_select, \
+    favorites_version_select, resource_token, collection_token
+from utils import APIException, get_page_args, validators, is_not_modified
+
+
+def async_database_url(url):
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def async_engine(url):
+    return create_async_engine(
+        async_database_url(url),
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    )
+
+
+engine = async_engine(flask_app.config['SQLALCHEMY_DATABASE_URI'])
+Session = async_sessionmaker(engine, expire_on_commit=False)
+# Una sesion por replica; la salud y el retraso los sigue el mismo hilo que en Flask
+replica_engines = {replica.key: async_engine(flask_app.config['SQLALCHEMY_BINDS'][replica.key])
+                   for replica in replicas.replicas}
+replica_sessions = {key: async_sessionmaker(replica_engine, expire_on_commit=False)
+                    for key, replica_engine in replica_engines.items()}
+
+# Parametros con los que la respuesta async es identica a la de Flask
+SUPPORTED_ARGS = {"limit", "after"}
+
+
+# Consultas (mismo resultado que las vistas de routes.py)
+
+
+async def character_rows(session, page):
+    query = select(Character.id, Character.name, Character.specie)
+    return await keyset_rows(session, query, Character, page)
+
+
+async def planet_rows(session, page):
+    return await keyset_rows(session, select(Planet.id, Planet.name), Planet, page)
+
+
+def favorite_select(*where):
+    return select(
+        Favorites.id, Favorites.id_user, Favorites.id_character, Favorites.id_planet,
+        Character.name.label("character_name"), Planet.name.label("planet_name")
+    ).outerjoin(Favorites.character).outerjoin(Favorites.planet).where(*where)
+
+
+async def favorite_rows(session, page, *where):
+    rows, next_cursor = await keyset_rows(session, favorite_select(*where), Favorites, page)
+    return [serialize_favorite(row) for row in rows], next_cursor
+
+
+async def keyset_rows(session, query, model, page):
+    if page is None:
+        rows = (await session.execute(query.order_by(model.id))).all()
+        return [row._asdict() for row in rows], None
+
+    limit, after = page
+    if after is not None:
+        query = query.where(model.id > after)
+    rows = (await session.execute(query.order_by(model.id).limit(limit + 1))).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [row._asdict() for row in rows[:limit]], next_cursor
+
+
+def serialize_favorite(row):
+    data = {"id": row["id"], "id_user": row["id_user"], "tipo": "unknown"}
+    if row["id_character"]:
+        data["tipo"], data["name"] = "character", row["character_name"]
+    elif row["id_planet"]:
+        data["tipo"], data["name"] = "planet", row["planet_name"]
+    return data
+
+
+def listing(rows, next_cursor, page, empty_message):
+    if page is not None:
+        return {"results": rows, "next_cursor": next_cursor}, 200
+    if not rows:
+        return {"message": empty_message}, 404
+    return rows, 200
+
+
+# Versiones (mismo token que usa @conditional en routes.py)
+
+
+async def people_version(session, id=None):
+    if id is not None:
+        return resource_token(await session.scalar(resource_version_select(Character, id)))
+    return collection_token((await session.execute(collection_version_select(Character))).one())
+
+
+async def planets_version(session, id=None):
+    if id is not None:
+        return resource_token(await session.scalar(resource_version_select(Planet, id)))
+    return collection_token((await session.execute(collection_version_select(Planet))).one())
+
+
+async def favorites_version(session, id_user=None):
+    where = () if id_user is None else (Favorites.id_user == id_user,)
+    return collection_token((await session.execute(favorites_version_select(*where))).one())
+
+
+# Vistas async: devuelven (cuerpo, status)
+
+
+async def get_all_people(session, req):
+    page = get_page_args(args=req.args)
+    rows, next_cursor = await character_rows(session, page)
+    return listing(rows, next_cursor, page, "No se encuentran characters")
+
+
+async def get_people(session, req, id):
+    row = (await session.execute(
+        select(Character.id, Character.name, Character.specie).where(Character.id == id))).first()
+    if row is None:
+        return {"message": "Not found"}, 404
+    return row._asdict(), 200
+
+
+async def get_all_planets(session, req):
+    page = get_page_args(args=req.args)
+    rows, next_cursor = await planet_rows(session, page)
+    return listing(rows, next_cursor, page, "No se encontraron planetas")
+
+
+async def get_planet(session, req, id):
+    row = (await session.execute(select(Planet.id, Planet.name).where(Planet.id == id))).first()
+    if row is None:
+        return {"message": "Not found"}, 404
+    return row._asdict(), 200
+
+
+async def get_all_favorites(session, req):
+    page = get_page_args(args=req.args)
+    rows, next_cursor = await favorite_rows(session, page)
+    return listing(rows, next_cursor, page, "No hay favoritos")
+
+
+async def load_user_favorites(session, id_user):
+    # Mismo contenido que load_user_favorites de routes.py, comparten user_favorites.
+    # La sesion es por peticion: la version y la vista reutilizan la misma entrada
+    entries = session.info.setdefault('user_favorites', {})
+    if id_user not in entries:
+        entries[id_user] = await fetch_user_favorites(session, id_user)
+    return entries[id_user]
+
+
+async def fetch_user_favorites(session, id_user):
+    entry = user_favorites.peek(id_user)
+    if entry is not None:
+        return entry
+    generation = user_favorites.generation(id_user)
+    if await session.get(User, id_user) is None:
+        return None
+    rows = (await session.execute(
+        favorite_select(Favorites.id_user == id_user).order_by(Favorites.id))).all()
+    items = [serialize_favorite(row._asdict()) for row in rows]
+    keys = [("character", row.id_character) if row.id_character else ("planet", row.id_planet) for row in rows]
+    return user_favorites.store(id_user, generation, items, keys, await favorites_version(session, id_user))
+
+
+async def user_favorites_version(session, id_user):
+    entry = await load_user_favorites(session, id_user)
+    return entry.version if entry is not None else None
+
+
+async def get_all_favorites_user(session, req, id):
+    entry = await load_user_favorites(session, id)
+    if entry is None:
+        return {"message": "User not exist"}, 404
+    if not entry.items:
+        return {"message": "No hay favoritos"}, 404
+    return entry.items, 200
+
+
+# (patron, endpoint de Flask, namespace de cache, version, vista)
+ROUTES = [
+    (re.compile(r"^/people/?$"), "api.get_all_people", "people", people_version, get_all_people),
+    (re.compile(r"^/people/(\d+)/?$"), "api.get_people", "people", people_version, get_people),
+    (re.compile(r"^/planets/?$"), "api.get_all_planets", "planets", planets_version, get_all_planets),
+    (re.compile(r"^/planets/(\d+)/?$"), "api.get_planet", "planets", planets_version, get_planet),
+    (re.compile(r"^/favorite/?$"), "api.get_all_favorites", None, favorites_version, get_all_favorites),
+    (re.compile(r"^/users/(\d+)/favorites/?$"), "api.get_all_favorites_user", None, user_favorites_version,
+     get_all_favorites_user),
+]
+
+
+def match_route(req):
+    if req.method != "GET" or set(req.args) - SUPPORTED_ARGS:
+        return None
+    if req.accept_mimetypes.best == "application/x-ndjson":
+        return None
+    for pattern, endpoint, namespace, version, view in ROUTES:
+        match = pattern.match(req.path)
+        if match:
+            return endpoint, namespace, version, view, [int(group) for group in match.groups()]
+    return None
+
+
+def wsgi_environ(scope):
+    # Lo minimo para reutilizar werkzeug.Request (args, ETags, Accept-*)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": (scope.get("server") or ("localhost", 80))[0],
+        "SERVER_PORT": str((scope.get("server") or ("localhost", 80))[1]),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        environ[key] = value.decode("latin-1")
+    return environ
+
+
+def session_for(req):
+    # Mismas reglas que RoutingSession para un GET: replica sana salvo cliente fijado
+    if not replica_sessions:
+        return Session
+    replicas.start(flask_app)
+    with flask_app.app_context():
+        key = None if replicas.pinned(req) else replicas.pick()
+    db_reads_routed_total.inc(target=key or "primary")
+    return replica_sessions[key] if key else Session
+
+
+async def serve(req, namespace, get_version, view, args):
+    if catalog.enabled and namespace in catalog.models:
+        catalog.start(flask_app)
+        with flask_app.app_context():
+            response = catalog.respond(namespace, req, *args)
+        if response is not None:
+            return response
+
+    key = f"{namespace}:{req.full_path}" if namespace and cache.enabled else None
+    entry = cache.backend.get(key) if key else None
+    if entry is not None:
+        cache.hits += 1
+        body, status, headers, variants = entry
+        response = flask_app.response_class(body, status=status, headers=headers).make_conditional(req)
+        response.encoded_variants = variants
+        return response
+    if key:
+        cache.misses += 1
+
+    etag = last_modified = None
+    async with session_for(req)() as session:
+        # Como @conditional: si el cliente ya tiene la version actual no se ejecuta la vista
+        version = await get_version(session, *args)
+        if version is not None:
+            etag, last_modified = validators(req.full_path, version)
+            if is_not_modified(req, etag, last_modified):
+                response = flask_app.response_class(status=304)
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                return response
+        try:
+            data, status = await view(session, req, *args)
+        except APIException as error:
+            data, status = error.to_dict(), error.status_code
+
+    response = flask_app.json.response(data)
+    response.status_code = status
+    if status == 200 and etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    if key and status == 200:
+        response.encoded_variants = {}
+        cache.backend.set(key, (response.get_data(), status, list(response.headers),
+                                response.encoded_variants), cache.ttl)
+    return response
+
+
+class AsyncApp:
+
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return await self.wsgi(scope, receive, send)
+
+        req = Request(wsgi_environ(scope))
+        route = match_route(req)
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+
+        start = time.perf_counter()
+        endpoint, namespace, get_version, view, args = route
+        response = await serve(req, namespace, get_version, view, args)
+        if flask_app.config.get('COMPRESS_ENABLED'):
+            response = compress.compress_for(response, req.accept_encodings)
+        # Mismas cabeceras que pone flask_cors con la configuracion por defecto
+        if "Origin" in req.headers:
+            response.headers["Access-Control-Allow-Origin"] = req.headers["Origin"]
+            response.vary.add("Origin")
+
+        body = response.get_data()
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+        http_requests_total.inc(endpoint=endpoint, method="GET", status=response.status_code)
+        http_request_duration.observe(time.perf_counter() - start, endpoint=endpoint, method="GET")
+        http_response_size.observe(len(body), endpoint=endpoint)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await engine.dispose()
+                for replica_engine in replica_engines.values():
+                    await replica_engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = AsyncApp(flask_app)
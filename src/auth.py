@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import select
+from cache import LRUCache
+from models import db, User
+
+# Verificacion de JWT sin ir a la base de datos en cada peticion:
+# - el usuario del token se resuelve una vez y se guarda (por identidad) con TTL corto
+# - los tokens revocados en /logout se guardan por jti hasta que expiran
+
+CurrentUser = namedtuple("CurrentUser", "id email name is_active")
+
+
+class RevocationStore:
+    # Interfaz del denylist; uno compartido entre workers (Redis con SETEX, por ejemplo)
+    # solo tiene que implementar estos metodos.
+
+    def add(self, jti, expires_at):
+        raise NotImplementedError
+
+    def __contains__(self, jti):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class MemoryRevocationStore(RevocationStore):
+    # jti -> exp (epoch). Los tokens llevan todos la misma duracion, asi que el orden
+    # de insercion es tambien el de expiracion: se purga por el principio.
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._data[jti] = expires_at
+            self._data.move_to_end(jti)
+            self._purge()
+
+    def _purge(self):
+        now = time.time()
+        while self._data:
+            jti, expires_at = next(iter(self._data.items()))
+            if expires_at > now and len(self._data) <= self.max_entries:
+                break
+            # Si se llena se pierde el mas antiguo: dimensionar max_entries por encima
+            # de los logouts esperados durante JWT_ACCESS_TOKEN_EXPIRES
+            if expires_at > now:
+                self.evictions += 1
+            del self._data[jti]
+
+    def __contains__(self, jti):
+        expires_at = self._data.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class Auth:
+
+    def __init__(self, app=None, jwt=None):
+        self.users = LRUCache()
+        self.revoked = MemoryRevocationStore()
+        self.user_ttl = 60
+        if app is not None:
+            self.init_app(app, jwt)
+
+    def init_app(self, app, jwt):
+        app.config.setdefault('AUTH_USER_CACHE_TTL', 60)
+        app.config.setdefault('AUTH_USER_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('JWT_REVOCATION_MAX_ENTRIES', 100000)
+        app.config.setdefault('JWT_REVOCATION_STORE', None)
+
+        self.user_ttl = app.config['AUTH_USER_CACHE_TTL']
+        self.users = LRUCache(app.config['AUTH_USER_CACHE_MAX_ENTRIES'])
+        self.revoked = app.config['JWT_REVOCATION_STORE'] or MemoryRevocationStore(
+            app.config['JWT_REVOCATION_MAX_ENTRIES'])
+
+        jwt.user_lookup_loader(self.load_user)
+        jwt.token_in_blocklist_loader(self.is_revoked)
+
+    def load_user(self, jwt_header, jwt_data):
+        # Devolver None hace que flask_jwt_extended responda 401
+        identity = jwt_data["sub"]
+        user = self.users.get(identity)
+        if user is None:
+            row = db.session.execute(select(User.id, User.email, User.name, User.is_active)
+                                     .where(User.email == identity)).first()
+            if row is None:
+                return None
+            user = CurrentUser(*row)
+            self.users.set(identity, user, self.user_ttl)
+        return user
+
+    def is_revoked(self, jwt_header, jwt_data):
+        return jwt_data["jti"] in self.revoked
+
+    def revoke(self, jwt_data):
+        self.revoked.add(jwt_data["jti"], jwt_data["exp"])
+
+    def forget_user(self, identity):
+        # Llamar cuando cambia o se borra el usuario
+        self.users.delete(identity)
+
+
+auth = Auth()
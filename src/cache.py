@@ -0,0 +1,268 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import request, make_response, Response
+from utils import wants_stream
+
+
+class CacheBackend:
+    # Interfaz minima para un backend de cache; uno compartido (Redis, memcached)
+    # solo tiene que implementar estos metodos.
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class LRUCache(CacheBackend):
+    # Cache en memoria del proceso, con expiracion por TTL y expulsion LRU
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    # Cache read-through de respuestas GET, agrupadas por namespace para poder
+    # invalidarlas desde los handlers que escriben
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_ENABLED', True)
+        app.config.setdefault('CACHE_TTL', 60)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_BACKEND', None)
+
+        self.enabled = app.config['CACHE_ENABLED']
+        self.ttl = app.config['CACHE_TTL']
+        self.backend = app.config['CACHE_BACKEND'] or LRUCache(app.config['CACHE_MAX_ENTRIES'])
+
+    def cached(self, namespace):
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET' or wants_stream():
+                    return f(*args, **kwargs)
+
+                key = f"{namespace}:{request.full_path}"
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    body, status, headers, variants = entry
+                    response = Response(body, status=status, headers=headers).make_conditional(request)
+                    response.encoded_variants = variants
+                    return response
+
+                self.misses += 1
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    # variants guarda las versiones comprimidas de esta entrada (ver compression.py)
+                    response.encoded_variants = {}
+                    self.backend.set(key, (
+                        response.get_data(), response.status_code, list(response.headers),
+                        response.encoded_variants), self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidates(self, *namespaces):
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.invalidate(*namespaces)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.delete_prefix(f"{namespace}:")
+        for listener in self.listeners:
+            listener(namespaces)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self.backend),
+            "evictions": getattr(self.backend, 'evictions', None),
+            "ttl": self.ttl
+        }
+
+
+cache = ResponseCache()
+
+
+# Favoritos por usuario
+# items: lista serializada (la misma que devuelve /users/<id>/favorites)
+# keys: frozenset de (tipo, id) para saber si un item es favorito sin consultar
+# version: token de favorites_version para el ETag
+UserFavorites = namedtuple("UserFavorites", "items keys version")
+
+
+class UserFavoritesCache:
+    # Los handlers que escriben favoritos invalidan la entrada de ese usuario; las
+    # escrituras sobre characters/planets (cambian los nombres) invalidan todas.
+    # Solo ve las escrituras de su worker: las de otros workers llegan cuando vence
+    # el TTL, hasta entonces "es favorito" puede estar desfasado. Por eso el TTL es corto.
+    #
+    # Cada entrada del LRU es (generacion, UserFavorites o None): invalidate deja una
+    # entrada sin datos con la generacion siguiente, asi que el estado por usuario esta
+    # acotado por FAVORITES_CACHE_MAX_USERS. La generacion que ve un loader incluye
+    # ademas una epoca global (clear) y las expulsiones del LRU: si la entrada del
+    # usuario se expulsa o se borra a mitad de carga, store() descarta el resultado.
+
+    def __init__(self, app=None):
+        self.backend = LRUCache()
+        self.ttl = 30
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FAVORITES_CACHE_ENABLED', True)
+        app.config.setdefault('FAVORITES_CACHE_TTL', 30)
+        app.config.setdefault('FAVORITES_CACHE_MAX_USERS', 10000)
+
+        self.enabled = app.config['FAVORITES_CACHE_ENABLED']
+        self.ttl = app.config['FAVORITES_CACHE_TTL']
+        self.backend = LRUCache(app.config['FAVORITES_CACHE_MAX_USERS'])
+        if self.on_invalidate not in cache.listeners:
+            cache.listeners.append(self.on_invalidate)
+
+    def key(self, id_user):
+        return f"{id_user}:favorites"
+
+    def _token(self, entry):
+        return self._epoch, self.backend.evictions, entry[0] if entry is not None else 0
+
+    def generation(self, id_user):
+        # Se toma antes de leer de la base de datos; store() descarta la entrada si
+        # hubo una invalidacion mientras tanto
+        with self._lock:
+            return self._token(self.backend.get(self.key(id_user)))
+
+    def peek(self, id_user):
+        if not self.enabled:
+            return None
+        entry = self.backend.get(self.key(id_user))
+        if entry is None or entry[1] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def store(self, id_user, generation, items, keys, version):
+        favorites = UserFavorites(items, frozenset(keys), version)
+        with self._lock:
+            if self.enabled and self._token(self.backend.get(self.key(id_user))) == generation:
+                self.backend.set(self.key(id_user), (generation[2], favorites), self.ttl)
+        return favorites
+
+    def get(self, id_user, loader):
+        # loader() -> (items, keys, version), o None si el usuario no existe (no se cachea)
+        entry = self.peek(id_user)
+        if entry is not None:
+            return entry
+        generation = self.generation(id_user)
+        loaded = loader()
+        if loaded is None:
+            return None
+        return self.store(id_user, generation, *loaded)
+
+    def invalidate(self, id_user):
+        with self._lock:
+            entry = self.backend.get(self.key(id_user))
+            self.backend.set(self.key(id_user), (self._token(entry)[2] + 1, None), self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self.backend.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self.backend),
+            "ttl": self.ttl
+        }
+
+    def on_invalidate(self, namespaces):
+        if "people" in namespaces or "planets" in namespaces:
+            self.clear()
+
+
+user_favorites = UserFavoritesCache()
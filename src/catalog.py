@@ -0,0 +1,256 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, request
+from cache import cache
+from models import db, Character, Planet, collection_version_select, collection_token, column_rows
+from utils import APIException, get_page_args, validators, is_not_modified
+
+# Snapshot en memoria de los catalogos (characters y planets): tablas pequenas que
+# casi no cambian. Cada worker guarda el JSON ya codificado de la coleccion entera y
+# sirve el listado, las paginas (?limit/&after) y /<id> cortando esos bytes, sin
+# consultas ni serializacion por peticion. Un hilo comprueba la version de la tabla
+# (mismo token que @conditional) y reconstruye el snapshot cuando cambia; el nuevo
+# reemplaza al anterior con una sola asignacion, asi que cada peticion ve uno entero.
+# Las escrituras de este worker lo invalidan al momento (listener de ResponseCache);
+# las de otros workers se ven en el siguiente chequeo.
+
+EPOCH = datetime(1970, 1, 1)
+
+# Parametros que se sirven desde el snapshot; el resto (?fields, filtros, stream) va a la base de datos
+SUPPORTED_ARGS = {"limit", "after"}
+
+
+def micros(stamp):
+    return (stamp - EPOCH) // timedelta(microseconds=1) if stamp is not None else -1
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=value) if value >= 0 else None
+
+
+class Snapshot:
+    # Inmutable. body es la respuesta completa del listado ("[...]\n"); el item i ocupa
+    # body[starts[i]:starts[i + 1] - 1] (el -1 quita la coma o el "]" que le sigue).
+
+    __slots__ = ("version", "generation", "body", "ids", "starts", "updated", "encoded_variants")
+
+    def __init__(self, version, generation, body, ids, starts, updated):
+        self.version = version
+        self.generation = generation
+        self.body = body
+        self.ids = ids
+        self.starts = starts
+        self.updated = updated
+        # Variantes comprimidas del listado completo, las rellena compress al primer uso
+        self.encoded_variants = {}
+
+    @classmethod
+    def build(cls, version, generation, rows, encode):
+        # rows: (id, updated_at, dict serializado) en orden de id
+        # Se copia cada item al bytearray en cuanto se codifica: orjson reserva ~1KB por
+        # resultado y guardar una lista de items multiplicaria el pico de memoria
+        ids, starts, updated = array('q'), array('q'), array('q')
+        body = bytearray(b"[")
+        for id, updated_at, data in rows:
+            if ids:
+                body += b","
+            ids.append(id)
+            starts.append(len(body))
+            updated.append(micros(updated_at))
+            body += encode(data)
+        starts.append(len(body) + 1)
+        body += b"]\n"
+        return cls(version, generation, bytes(body), ids, starts, updated)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, id):
+        i = bisect_left(self.ids, id)
+        return i if i < len(self.ids) and self.ids[i] == id else None
+
+    def item(self, i):
+        return self.body[self.starts[i]:self.starts[i + 1] - 1]
+
+    def page(self, limit, after=None):
+        first = 0 if after is None else bisect_right(self.ids, after)
+        last = min(first + limit, len(self.ids))
+        next_cursor = self.ids[last - 1] if last < len(self.ids) else None
+        items = self.body[self.starts[first]:self.starts[last] - 1] if last > first else b""
+        return items, next_cursor
+
+
+class Catalog:
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.interval = 5
+        self.max_rows = 500000
+        self.models = {}
+        self.snapshots = {}
+        self.generations = {}
+        self.builds = 0
+        self.wake = threading.Event()
+        self._lock = threading.Lock()
+        self._refresher = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CATALOG_SNAPSHOT', False)
+        app.config.setdefault('CATALOG_REFRESH_INTERVAL', 5)
+        app.config.setdefault('CATALOG_MAX_ROWS', 500000)
+
+        self.enabled = app.config['CATALOG_SNAPSHOT']
+        self.interval = app.config['CATALOG_REFRESH_INTERVAL']
+        self.max_rows = app.config['CATALOG_MAX_ROWS']
+        # namespace de ResponseCache -> modelo
+        self.models = {"people": Character, "planets": Planet}
+        # Estado nuevo por app: los snapshots de otra app (otra base de datos) no valen,
+        # y el hilo de la app anterior termina al ver que su dict ya no es el actual
+        self.snapshots = {}
+        self.generations = {kind: 0 for kind in self.models}
+        self.builds = 0
+        previous, self.wake = self.wake, threading.Event()
+        previous.set()
+        self._refresher = None
+        if self.enabled:
+            if self.on_invalidate not in cache.listeners:
+                cache.listeners.append(self.on_invalidate)
+            app.before_request(lambda: self.start(current_app._get_current_object()))
+
+    def on_invalidate(self, namespaces):
+        changed = [kind for kind in namespaces if kind in self.generations]
+        for kind in changed:
+            self.generations[kind] += 1
+        if changed:
+            self.wake.set()
+
+    def current(self, kind):
+        # El snapshot solo vale si ninguna escritura de este worker lo ha invalidado
+        snapshot = self.snapshots.get(kind)
+        if snapshot is None or snapshot.generation != self.generations[kind]:
+            return None
+        return snapshot
+
+    # Vistas
+
+    def serves(self, kind):
+        # Decorador de las vistas GET: responde desde el snapshot o llama a la vista
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                id = next(iter(kwargs.values()), None)
+                response = self.respond(kind, request, id) if self.enabled else None
+                return response if response is not None else f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def respond(self, kind, req, id=None):
+        # None si la peticion no se puede servir desde el snapshot
+        snapshot = self.current(kind)
+        # Los bytes del snapshot son compactos: si jsonify indenta, responde la base de datos
+        if snapshot is None or current_app.json.pretty() or req.accept_mimetypes.best == "application/x-ndjson":
+            return None
+        if id is not None:
+            if req.args:
+                return None
+            i = snapshot.index(id)
+            if i is None:
+                # Puede ser una fila nueva de otro worker: la base de datos decide el 404
+                return None
+            updated_at = from_micros(snapshot.updated[i])
+            version = (updated_at.isoformat(), updated_at) if updated_at is not None else None
+            return self.make_response(req, snapshot.item(i) + b"\n", version)
+
+        if set(req.args) - SUPPORTED_ARGS:
+            return None
+        try:
+            page = get_page_args(args=req.args)
+        except APIException:
+            return None
+        if page is None:
+            if not len(snapshot):
+                return None
+            return self.make_response(req, snapshot.body, snapshot.version, snapshot.encoded_variants)
+        items, next_cursor = snapshot.page(*page)
+        # Mismo formato que jsonify con claves ordenadas: next_cursor va antes que results
+        head = current_app.json.encode({"next_cursor": next_cursor, "results": []})
+        return self.make_response(req, head[:-2] + items + b"]}\n", snapshot.version)
+
+    def make_response(self, req, body, version, variants=None):
+        response_class = current_app.response_class
+        etag = last_modified = None
+        if version is not None:
+            etag, last_modified = validators(req.full_path, version)
+            if is_not_modified(req, etag, last_modified):
+                response = response_class(status=304)
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                return response
+        response = response_class(body, mimetype="application/json")
+        if etag is not None:
+            response.set_etag(etag)
+            response.last_modified = last_modified
+        if variants is not None:
+            response.encoded_variants = variants
+        return response
+
+    # Refresco en segundo plano
+
+    def start(self, app):
+        # Un hilo por worker, arrancado en la primera peticion (despues del fork de gunicorn)
+        if self._refresher is None and self.enabled:
+            with self._lock:
+                if self._refresher is None:
+                    self._refresher = threading.Thread(target=self.run, args=(app, self.snapshots, self.wake),
+                                                       name="catalog-refresh", daemon=True)
+                    self._refresher.start()
+
+    def run(self, app, snapshots, wake):
+        # Termina cuando init_app sustituye el dict de snapshots
+        while self.snapshots is snapshots:
+            with app.app_context():
+                for kind in self.models:
+                    try:
+                        self.refresh(kind, snapshots)
+                    except Exception as error:
+                        app.logger.warning("No se pudo refrescar el catalogo %s: %s", kind, error)
+            wake.wait(self.interval)
+            wake.clear()
+
+    def refresh(self, kind, snapshots=None):
+        snapshots = self.snapshots if snapshots is None else snapshots
+        model = self.models[kind]
+        generation = self.generations[kind]
+        # La version se lee antes que las filas: si cambian entre medias el
+        # siguiente chequeo ve otra version y reconstruye
+        row = db.session.execute(collection_version_select(model)).one()
+        version = collection_token(row)
+        snapshot = snapshots.get(kind)
+        if snapshot is not None and snapshot.generation == generation and snapshot.version[0] == version[0]:
+            return False
+        if row[0] > self.max_rows:
+            snapshots.pop(kind, None)
+            return False
+
+        query, serialize = column_rows(db.session.query(model), model, None)
+        query = query.add_columns(model.updated_at).order_by(model.id)
+        rows = ((row.id, row.updated_at, serialize(row)) for row in query.yield_per(1000))
+        snapshots[kind] = Snapshot.build(version, generation, rows, current_app.json.encode)
+        self.builds += 1
+        return True
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "builds": self.builds,
+            **{kind: {"rows": len(snapshot), "bytes": len(snapshot.body), "fresh": self.current(kind) is snapshot}
+               for kind, snapshot in self.snapshots.items()},
+        }
+
+
+catalog = Catalog()
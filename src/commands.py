@@ -0,0 +1,11 @@
+import click
+from models import rebuild_favorite_counters, FavoriteCounter, db
+
+
+def setup_commands(app):
+
+    @app.cli.command("rebuild-favorite-counters")
+    def rebuild_counters():
+        """Recalcula favorite_counters a partir de la tabla favorites."""
+        rebuild_favorite_counters()
+        click.echo(f"{db.session.query(FavoriteCounter).count()} contadores reconstruidos")
@@ -0,0 +1,78 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compresion gzip/brotli de las respuestas segun Accept-Encoding. Las respuestas
+# servidas desde ResponseCache traen encoded_variants: el dict donde se guardan
+# los bytes ya comprimidos de esa entrada, para no recomprimir en cada hit.
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+
+class Compress:
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.level = 6
+        self.br_level = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.br_level = app.config['COMPRESS_BR_LEVEL']
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self.compress_response)
+
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.br_level)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def compress_response(self, response):
+        return self.compress_for(response, request.accept_encodings)
+
+    def compress_for(self, response, accept_encodings):
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = accept_encodings.best_match(self.encodings())
+        if encoding is None or response.content_length is None or response.content_length < self.min_size:
+            return response
+
+        variants = getattr(response, 'encoded_variants', None)
+        body = variants.get(encoding) if variants is not None else None
+        if body is None:
+            body = self.compress(response.get_data(), encoding)
+            if variants is not None:
+                variants[encoding] = body
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        # El ETag identifica el contenido sin comprimir, pasa a ser debil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compress = Compress()
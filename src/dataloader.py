@@ -0,0 +1,60 @@
+from flask import g, has_request_context
+from sqlalchemy import select, inspect
+from sqlalchemy.orm.util import identity_key
+from models import db
+
+# Carga por primary key sin repetir consultas dentro de una peticion:
+# - los objetos ya cargados salen del identity map de la sesion (sin SQL); la
+#   sesion es por peticion y no expira los objetos al hacer commit
+# - los ids que no existen se recuerdan en g hasta el final de la peticion
+# - load_many trae todos los ids que faltan en un solo SELECT ... WHERE id IN (...)
+
+
+def missing_ids():
+    if not has_request_context():
+        return set()
+    if '_missing_ids' not in g:
+        g._missing_ids = set()
+    return g._missing_ids
+
+
+def load(model, id):
+    missing = missing_ids()
+    if (model, id) in missing:
+        return None
+    obj = db.session.get(model, id)
+    if obj is None:
+        missing.add((model, id))
+    return obj
+
+
+def cached(model, id):
+    # El objeto del identity map si esta cargado y sin expirar, sin ir a la base de datos
+    obj = db.session.identity_map.get(identity_key(model, id))
+    if obj is None or inspect(obj).expired_attributes:
+        return None
+    return obj
+
+
+def load_many(model, ids, *options):
+    # {id: objeto} con los que existen, en el orden de ids
+    missing = missing_ids()
+    found, pending = {}, []
+    for id in dict.fromkeys(ids):
+        if (model, id) in missing:
+            continue
+        obj = cached(model, id)
+        if obj is not None:
+            found[id] = obj
+        else:
+            pending.append(id)
+
+    if pending:
+        loaded = {obj.id: obj for obj in db.session.scalars(
+            select(model).where(model.id.in_(pending)).options(*options))}
+        for id in pending:
+            if id in loaded:
+                found[id] = loaded[id]
+            else:
+                missing.add((model, id))
+    return {id: found[id] for id in dict.fromkeys(ids) if id in found}
@@ -0,0 +1,65 @@
+from flask.json.provider import DefaultJSONProvider
+
+# Proveedor JSON de Flask que usa orjson o msgspec si estan instalados y el json
+# de la libreria estandar si no. Mantiene el mismo formato que jsonify: claves
+# ordenadas y fechas en formato HTTP (via DefaultJSONProvider.default).
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = app.config.get('JSON_BACKEND') or (
+            "orjson" if orjson else "msgspec" if msgspec else "json")
+
+        if self.backend == "orjson":
+            self._options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                             | orjson.OPT_PASSTHROUGH_DATACLASS)
+            if self.sort_keys:
+                self._options |= orjson.OPT_SORT_KEYS
+        elif self.backend == "msgspec":
+            self._encoder = msgspec.json.Encoder(
+                enc_hook=self.default, order="sorted" if self.sort_keys else None)
+            self._decoder = msgspec.json.Decoder()
+
+    def encode(self, obj):
+        # bytes UTF-8, sin pasar por str
+        if self.backend == "orjson":
+            return orjson.dumps(obj, default=self.default, option=self._options)
+        if self.backend == "msgspec":
+            return self._encoder.encode(obj)
+        # Compacto, como DefaultJSONProvider.response fuera de debug
+        return super().dumps(obj, separators=(",", ":")).encode('utf-8')
+
+    def pretty(self):
+        # Como en DefaultJSONProvider.response: con el json estandar y debug (o compact=False)
+        # la respuesta va indentada y ya no coincide con encode
+        return self.backend == "json" and ((self.compact is None and self._app.debug) or self.compact is False)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or self.backend == "json":
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or self.backend == "json":
+            return super().loads(s, **kwargs)
+        if self.backend == "orjson":
+            return orjson.loads(s)
+        return self._decoder.decode(s)
+
+    def response(self, *args, **kwargs):
+        if self.pretty():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,250 @@
+import threading
+import time
+from flask import Response, request, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Metricas en memoria del worker, exportadas en formato de texto de Prometheus.
+# Con varios workers de gunicorn cada proceso expone las suyas.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        return self.header() + [
+            f"{self.name}{format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        values = dict(self._values)
+        if self.callback is not None:
+            value = self.callback()
+            if value is None:
+                return []
+            values[()] = value
+        return self.header() + [f"{self.name}{format_labels(key)} {value}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        for key, (buckets, total, count) in list(self._values.items()):
+            for bound, bucket in zip(self.buckets, buckets):
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', bound),))} {bucket}")
+            lines.append(f"{self.name}_bucket{format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        # Volver a registrar un nombre (p.ej. otra app de create_app) reemplaza la metrica
+        self.metrics = [other for other in self.metrics if other.name != metric.name]
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation, callback=None):
+        return self.register(Gauge(name, documentation, callback))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# Connection pool
+
+pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds", "Tiempo esperando una conexion libre del pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+pool_overflow_total = registry.counter(
+    "db_pool_overflow_total", "Conexiones abiertas por encima de pool_size")
+pool_timeouts_total = registry.counter(
+    "db_pool_timeouts_total", "Peticiones que agotaron pool_timeout esperando conexion")
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool que mide cuanto espera cada checkout
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts_total.inc()
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
+
+    def _create_connection(self):
+        # _do_get incrementa el overflow antes de abrir la conexion
+        if self.overflow() > 0:
+            pool_overflow_total.inc()
+        return super()._create_connection()
+
+
+# Requests y SQL
+
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+http_requests_total = registry.counter(
+    "http_requests_total", "Peticiones atendidas por endpoint, metodo y status")
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Latencia de cada peticion hasta devolver la respuesta")
+http_response_size = registry.histogram(
+    "http_response_size_bytes", "Tamano del body de la respuesta", buckets=SIZE_BUCKETS)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "Sentencias SQL ejecutadas por peticion", buckets=COUNT_BUCKETS)
+db_query_seconds_per_request = registry.histogram(
+    "db_query_seconds_per_request", "Tiempo total en SQL por peticion")
+db_queries_total = registry.counter(
+    "db_queries_total", "Sentencias SQL ejecutadas por endpoint")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_time += elapsed
+
+
+def start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+
+
+def record_request(response):
+    if 'request_start' not in g:
+        return response
+    # Las rutas sin match se agrupan para no disparar la cardinalidad de labels
+    endpoint = request.endpoint or "unmatched"
+    http_requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    http_request_duration.observe(time.perf_counter() - g.request_start, endpoint=endpoint, method=request.method)
+    if not response.is_streamed and response.content_length is not None:
+        http_response_size.observe(response.content_length, endpoint=endpoint)
+    db_queries_per_request.observe(g.sql_count, endpoint=endpoint)
+    db_query_seconds_per_request.observe(g.sql_time, endpoint=endpoint)
+    if g.sql_count:
+        db_queries_total.inc(g.sql_count, endpoint=endpoint)
+    return response
+
+
+class Metrics:
+
+    def __init__(self, app=None):
+        self.registry = registry
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        if not app.config['METRICS_ENABLED']:
+            return
+        app.add_url_rule('/metrics', 'metrics', self.export)
+        app.before_request(start_request)
+        app.after_request(record_request)
+
+    def track_pool(self, get_pool):
+        # get_pool se evalua en cada scrape, el engine se crea de forma perezosa
+        def value(read):
+            def callback():
+                pool = get_pool()
+                return read(pool) if isinstance(pool, QueuePool) else None
+            return callback
+
+        self.registry.gauge("db_pool_size", "Tamano configurado del pool",
+                            value(lambda pool: pool.size()))
+        self.registry.gauge("db_pool_checked_out", "Conexiones prestadas ahora mismo",
+                            value(lambda pool: pool.checkedout()))
+        self.registry.gauge("db_pool_checked_in", "Conexiones libres en el pool",
+                            value(lambda pool: pool.checkedin()))
+        self.registry.gauge("db_pool_overflow", "Conexiones de overflow abiertas",
+                            value(lambda pool: max(pool.overflow(), 0)))
+
+    def export(self):
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -1,8 +1,25 @@
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Boolean, ForeignKey, DateTime, Index, insert, update, delete, select, func, text, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload, load_only
+from sqlalchemy.dialects import postgresql, sqlite
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+# La sesion vive lo que dura la peticion: sin expire_on_commit los objetos ya
+# cargados se pueden serializar despues del commit sin volver a consultarlos.
+# RoutingSession manda las lecturas de las peticiones GET a las replicas (replicas.py)
+db = SQLAlchemy(session_options={"expire_on_commit": False, "class_": RoutingSession})
+
+
+def pick(obj, names, fields=None):
+    # Sparse fieldsets: solo se leen (y cargan) los atributos pedidos en ?fields=
+    return {name: getattr(obj, name) for name in names if not fields or name in fields}
+
+
+def utcnow():
+    # UTC sin tzinfo, igual que lo devuelve la base de datos
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class User(db.Model):
@@ -18,43 +35,55 @@ class User(db.Model):
     fav = relationship('Favorites', backref='user')
     # serialize
 
-    def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "email": self.email,
-            "favorites": [fav.serialize() for fav in self.fav]
-        }
+    def serialize(self, fields=None, expand=()):
+        data = pick(self, ("id", "name", "email"), fields)
+        if not fields or "favorites" in fields:
+            data["favorites"] = [fav.serialize(expand=expand) for fav in self.fav]
+        return data
 
 
 class Character(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
     specie: Mapped[str] = mapped_column(String(120), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow, server_default=func.now())
 
     # serialize
-    def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "specie": self.specie
-        }
+    serialize_fields = ("id", "name", "specie")
+
+    def serialize(self, fields=None):
+        return pick(self, self.serialize_fields, fields)
 
 
 class Planet(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow, server_default=func.now())
 
     # serialize
+    serialize_fields = ("id", "name")
 
-    def serialize(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-        }
+    def serialize(self, fields=None):
+        return pick(self, self.serialize_fields, fields)
 
 
 class Favorites(db.Model):
+    # Un usuario solo puede tener cada character/planet una vez; los indices parciales
+    # ignoran la columna que va a NULL segun el tipo de favorito
+    __table_args__ = (
+        Index('ix_favorites_id_user', 'id_user'),
+        Index('ix_favorites_id_character', 'id_character'),
+        Index('ix_favorites_id_planet', 'id_planet'),
+        Index('uq_favorites_user_character', 'id_user', 'id_character', unique=True,
+              postgresql_where=text('id_character IS NOT NULL'),
+              sqlite_where=text('id_character IS NOT NULL')),
+        Index('uq_favorites_user_planet', 'id_user', 'id_planet', unique=True,
+              postgresql_where=text('id_planet IS NOT NULL'),
+              sqlite_where=text('id_planet IS NOT NULL')),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=True, default='Unknown')
     tipo: Mapped[str] = mapped_column(String(50), nullable=True, default='Unknown')
@@ -63,43 +92,302 @@ class Favorites(db.Model):
         ForeignKey('planet.id'), nullable=True)
     id_character: Mapped[int] = mapped_column(
         ForeignKey('character.id'), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow, server_default=func.now())
 
     # relations
     character = relationship('Character', backref='favorites')
     planet = relationship('Planet', backref='favorites')
     # serialize
 
-    def serialize(self):
+    def serialize(self, fields=None, expand=()):
+        # ?expand=item incluye el character/planet completo
+        if "item" in expand:
+            return self.full_serialize(fields)
+
+        data = pick(self, ("id", "id_user"), fields)
+        # Solo se toca la relacion si el cliente pidio el nombre
+        wants_name = not fields or "name" in fields
         if self.id_character:
-            return {
-                "id": self.id,
-                "tipo": "character",
-                "name": self.character.name,
-                "id_user": self.id_user
-            }
+            data["tipo"] = "character"
+            if wants_name:
+                data["name"] = self.character.name
         elif self.id_planet:
-            return {
-                "id": self.id,
-                "tipo": "planet",
-                "name": self.planet.name,
-                "id_user": self.id_user
-            }
+            data["tipo"] = "planet"
+            if wants_name:
+                data["name"] = self.planet.name
         else:
-            return {
-                "id": self.id,
-                "tipo": "unknown",
-                "id_user": self.id_user
-            }
-
-    def full_serialize(self):
-        data_favorite = {
-            "id": self.id,
-            "id_user": self.id_user
-        }
-
-        if self.id_planet:
-            data_favorite['item'] = self.planet.serialize()
-        elif self.id_character:
-            data_favorite['item'] = self.character.serialize()
+            data["tipo"] = "unknown"
+
+        if fields and "tipo" not in fields:
+            del data["tipo"]
+        return data
+
+    def full_serialize(self, fields=None):
+        data_favorite = pick(self, ("id", "id_user"), fields)
+
+        if not fields or "item" in fields:
+            if self.id_planet:
+                data_favorite['item'] = self.planet.serialize()
+            elif self.id_character:
+                data_favorite['item'] = self.character.serialize()
 
         return data_favorite
+
+
+class FavoriteCounter(db.Model):
+    # Contadores desnormalizados de favoritos: tipo 'character' / 'planet' (veces que
+    # se marco ese item) y 'user' (favoritos de ese usuario). Se actualizan en la misma
+    # transaccion que el favorito; `flask rebuild-favorite-counters` los recalcula.
+    __tablename__ = 'favorite_counters'
+    __table_args__ = (
+        Index('ix_favorite_counters_tipo_count', 'tipo', 'count'),
+    )
+
+    tipo: Mapped[str] = mapped_column(String(20), primary_key=True)
+    item_id: Mapped[int] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+def is_unique_violation(error):
+    message = str(getattr(error, 'orig', error)).lower()
+    return isinstance(error, IntegrityError) and ('unique' in message or 'duplicate' in message)
+
+
+# loading strategies
+# Los endpoints de listado cargan el grafo completo en un numero fijo de queries
+# (uno por nivel) en lugar de hacer lazy load por cada fila.
+
+
+# Con fields/expand solo se cargan las columnas y relaciones que se van a serializar.
+
+
+def only_columns(model, fields):
+    columns = [getattr(model, name) for name in fields or ()
+               if name in model.__table__.columns]
+    return load_only(*columns) if columns else None
+
+
+def item_loaders(path=None, expand=()):
+    # Sin expand solo hace falta el nombre del character/planet
+    loaders = []
+    for relation, model in ((Favorites.character, Character), (Favorites.planet, Planet)):
+        loader = path.selectinload(relation) if path is not None else selectinload(relation)
+        if "item" not in expand:
+            loader = loader.load_only(model.name)
+        loaders.append(loader)
+    return loaders
+
+
+def favorites_with_items(fields=None, expand=()):
+    query = Favorites.query
+    if fields and "item" not in expand:
+        columns = set(fields) | {"id_character", "id_planet"}
+        query = query.options(only_columns(Favorites, columns))
+        if "name" not in fields:
+            return query
+    return query.options(*item_loaders(expand=expand))
+
+
+def users_with_favorites(fields=None, expand=()):
+    query = User.query
+    if fields:
+        query = query.options(only_columns(User, set(fields) | {"is_active"}))
+        if "favorites" not in fields:
+            return query
+    return query.options(*item_loaders(selectinload(User.fav), expand))
+
+
+def column_rows(query, model, fields=None):
+    # Selecciona directamente las columnas que se serializan: filas Core en lugar de
+    # objetos ORM, sin identity map ni diccionarios intermedios por instancia.
+    # Devuelve la query y una funcion fila -> dict con la misma forma que serialize().
+    names = [name for name in model.serialize_fields if not fields or name in fields]
+    columns = [getattr(model, name) for name in dict.fromkeys(("id", *names))]
+
+    def serialize(row):
+        return {name: getattr(row, name) for name in names}
+
+    return query.with_entities(*columns), serialize
+
+
+# keyset pagination
+# Cada pagina es un range scan sobre la primary key, su coste no depende de
+# lo profundo que pagine el cliente (a diferencia de OFFSET).
+
+
+def keyset_page(query, model, limit, after=None):
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# bulk operations
+# Un solo executemany por operacion en lugar de un INSERT/UPDATE/DELETE por fila.
+
+
+def bulk_insert(model, rows):
+    # Devuelve los ids en el orden de rows. sqlite no puede ordenar el RETURNING de un
+    # INSERT multi-fila sin columna centinela (haria un INSERT por fila): se inserta sin
+    # ordenar y se ordenan los ids, que sqlite asigna crecientes en el orden de VALUES
+    if db.session.get_bind().dialect.name == "sqlite":
+        result = db.session.execute(insert(model).returning(model.id), rows)
+        return sorted(row.id for row in result)
+    result = db.session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return [row.id for row in result]
+
+
+def bulk_update(model, rows):
+    db.session.execute(update(model), rows)
+
+
+def bulk_delete(model, ids):
+    db.session.execute(
+        delete(model).where(model.id.in_(ids)),
+        execution_options={"synchronize_session": False})
+
+
+def detach_favorites(model, ids):
+    # Lo que hace el ORM al borrar un character/planet: los favoritos que lo referencian
+    # se quedan con id_character/id_planet a NULL. Devuelve los usuarios afectados.
+    column = Favorites.id_character if model is Character else Favorites.id_planet
+    users = db.session.scalars(select(Favorites.id_user).where(column.in_(ids)).distinct()).all()
+    if users:
+        db.session.execute(
+            update(Favorites).where(column.in_(ids)).values({column.key: None}),
+            execution_options={"synchronize_session": False})
+    return users
+
+
+def existing_ids(model, ids):
+    return set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+# version tracking
+# Devuelven (token, last_modified) para construir el ETag sin serializar nada,
+# o None si el recurso no existe. Los *_select construyen la sentencia para que
+# asgi.py pueda ejecutarla con una AsyncSession.
+
+
+def resource_version_select(model, id):
+    return select(model.updated_at).where(model.id == id)
+
+
+def collection_version_select(model, *where):
+    # El count detecta borrados que no cambian el max(updated_at)
+    return select(func.count(model.id), func.max(model.updated_at)).where(*where)
+
+
+def favorites_version_select(*where):
+    # serialize() usa el nombre actual del character/planet, asi que sus cambios
+    # tambien cuentan como cambios de la coleccion
+    return select(
+        func.count(Favorites.id),
+        func.max(Favorites.updated_at),
+        func.max(Character.updated_at),
+        func.max(Planet.updated_at)
+    ).select_from(Favorites).outerjoin(Favorites.character).outerjoin(Favorites.planet).where(*where)
+
+
+def resource_token(updated_at):
+    if updated_at is None:
+        return None
+    return updated_at.isoformat(), updated_at
+
+
+def collection_token(row):
+    count, *stamps = row
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    last = max(stamps) if stamps else None
+    return f"{count}:{':'.join(stamp.isoformat() for stamp in stamps)}", last
+
+
+def resource_version(model, id):
+    return resource_token(db.session.scalar(resource_version_select(model, id)))
+
+
+def collection_version(model, *where):
+    return collection_token(db.session.execute(collection_version_select(model, *where)).one())
+
+
+def favorites_version(*where):
+    return collection_token(db.session.execute(favorites_version_select(*where)).one())
+
+
+
+# favorite counters
+
+
+def favorite_deltas(favorites, sign=1):
+    # {(tipo, item_id): delta} para una lista de favoritos (objetos o dicts de bulk_insert)
+    deltas = {}
+    for fav in favorites:
+        get = fav.get if isinstance(fav, dict) else lambda name: getattr(fav, name)
+        keys = [("user", get("id_user"))]
+        if get("id_character"):
+            keys.append(("character", get("id_character")))
+        elif get("id_planet"):
+            keys.append(("planet", get("id_planet")))
+        for key in keys:
+            deltas[key] = deltas.get(key, 0) + sign
+    return deltas
+
+
+def bump_favorite_counters(deltas):
+    # Upsert atomico count = count + delta; no hace commit, va en la transaccion del handler
+    rows = [{"tipo": tipo, "item_id": item_id, "count": delta}
+            for (tipo, item_id), delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(FavoriteCounter)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FavoriteCounter.tipo, FavoriteCounter.item_id],
+            set_={"count": FavoriteCounter.count + stmt.excluded.count})
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        result = db.session.execute(
+            update(FavoriteCounter)
+            .where(FavoriteCounter.tipo == row["tipo"], FavoriteCounter.item_id == row["item_id"])
+            .values(count=FavoriteCounter.count + row["count"]))
+        if result.rowcount == 0:
+            db.session.execute(insert(FavoriteCounter).values(**row))
+
+
+def delete_favorite_counters(tipo, ids):
+    # Al borrar characters/planets/usuarios; va en la transaccion del handler
+    db.session.execute(delete(FavoriteCounter).where(
+        FavoriteCounter.tipo == tipo, FavoriteCounter.item_id.in_(ids)))
+
+
+def favorite_count(tipo, item_id):
+    return db.session.scalar(select(FavoriteCounter.count).where(
+        FavoriteCounter.tipo == tipo, FavoriteCounter.item_id == item_id))
+
+
+def top_favorited(model, tipo, limit):
+    return db.session.execute(
+        select(model.id, model.name, FavoriteCounter.count.label("favorites_count"))
+        .join(FavoriteCounter, (FavoriteCounter.item_id == model.id) & (FavoriteCounter.tipo == tipo))
+        .where(FavoriteCounter.count > 0)
+        .order_by(FavoriteCounter.count.desc(), model.id)
+        .limit(limit)).all()
+
+
+def rebuild_favorite_counters():
+    db.session.execute(delete(FavoriteCounter))
+    for tipo, column in (("user", Favorites.id_user),
+                         ("character", Favorites.id_character),
+                         ("planet", Favorites.id_planet)):
+        db.session.execute(insert(FavoriteCounter).from_select(
+            ["tipo", "item_id", "count"],
+            select(literal(tipo), column, func.count(Favorites.id)).where(column.isnot(None)).group_by(column)))
+    db.session.commit()
@@ -0,0 +1,63 @@
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from utils import APIException
+
+
+class PasswordHasher:
+    # bcrypt en un pool de hilos acotado: bcrypt libera el GIL, asi que el resto de
+    # peticiones siguen avanzando, y una rafaga de signups/logins nunca ocupa mas
+    # de BCRYPT_MAX_WORKERS nucleos. Si la cola esta llena se responde 503.
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.queue_timeout = 5
+        self._executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_ROUNDS', 12)
+        app.config.setdefault('BCRYPT_MAX_WORKERS', 2)
+        app.config.setdefault('BCRYPT_MAX_PENDING', 16)
+        app.config.setdefault('BCRYPT_QUEUE_TIMEOUT', 5)
+
+        self.rounds = app.config['BCRYPT_ROUNDS']
+        self.queue_timeout = app.config['BCRYPT_QUEUE_TIMEOUT']
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config['BCRYPT_MAX_WORKERS'], thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(app.config['BCRYPT_MAX_PENDING'])
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise APIException("Servidor ocupado, intentalo de nuevo", status_code=503)
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, password, hashed):
+        if not is_bcrypt_hash(hashed):
+            # Usuarios antiguos guardados en texto plano; se rehashean al hacer login
+            return hmac.compare_digest(password.encode('utf-8'), hashed.encode('utf-8'))
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        return not is_bcrypt_hash(hashed) or hash_rounds(hashed) != self.rounds
+
+
+def is_bcrypt_hash(hashed):
+    return hashed.startswith(('$2a$', '$2b$', '$2y$'))
+
+
+def hash_rounds(hashed):
+    return int(hashed.split('$')[2])
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,180 @@
+import hmac
+import os
+import re
+import sys
+import time
+from collections import deque
+from flask import g, request, jsonify, current_app, has_request_context, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Profiler de SQL por peticion, opcional:
+# - SQL_PROFILER=always perfila todas las peticiones; =header solo las que traen
+#   X-SQL-Profile (igual a SQL_PROFILER_SECRET si esta configurado)
+# - cada sentencia se guarda con su duracion y el punto de src/ que la lanzo
+# - si la misma sentencia (con otros parametros) se repite SQL_N_PLUS_ONE veces
+#   se marca como posible N+1
+# - la respuesta lleva Server-Timing: db;dur=...;desc="N queries" y el perfil
+#   completo queda en el log y en /sql/profiles (con la misma cabecera X-SQL-Profile)
+# Aparte, con SQL_SLOW_QUERY_MS cualquier SELECT mas lento se loguea con su EXPLAIN,
+# este o no activo el profiler.
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+SKIP_FILES = {os.path.join(SRC, name) for name in ("profiler.py", "metrics.py")}
+IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    # Misma forma aunque cambie el numero de elementos de un IN (...)
+    return IN_LIST.sub("(?)", WHITESPACE.sub(" ", statement)).strip()
+
+
+def call_site():
+    # Primer frame de src/ (el mas interno) fuera del propio profiler
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(SRC) and filename not in SKIP_FILES:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def explain(conn, statement, parameters):
+    prefix = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN ", "mysql": "EXPLAIN "}.get(conn.dialect.name)
+    if prefix is None:
+        return None
+    conn.info['explaining'] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        return "\n".join(" ".join(str(value) for value in row) for row in rows)
+    except Exception as error:
+        return f"EXPLAIN fallo: {error}"
+    finally:
+        conn.info['explaining'] = False
+
+
+class SQLProfiler:
+
+    def __init__(self, app=None):
+        self.mode = "off"
+        self.secret = None
+        self.slow_ms = None
+        self.n_plus_one = 5
+        self.profiles = deque(maxlen=50)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_PROFILER', 'off')
+        app.config.setdefault('SQL_PROFILER_SECRET', None)
+        app.config.setdefault('SQL_PROFILER_KEEP', 50)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', None)
+        app.config.setdefault('SQL_N_PLUS_ONE', 5)
+
+        self.mode = app.config['SQL_PROFILER']
+        self.secret = app.config['SQL_PROFILER_SECRET']
+        self.slow_ms = app.config['SQL_SLOW_QUERY_MS']
+        self.n_plus_one = app.config['SQL_N_PLUS_ONE']
+        self.profiles = deque(maxlen=app.config['SQL_PROFILER_KEEP'])
+
+        if (self.mode != "off" or self.slow_ms) and not event.contains(
+                Engine, "before_cursor_execute", self.before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+        if self.mode != "off":
+            app.before_request(self.start)
+            app.after_request(self.finish)
+            app.add_url_rule('/sql/profiles', 'sql_profiles', self.list_profiles)
+
+    def authorized(self):
+        # X-SQL-Profile presente e igual a SQL_PROFILER_SECRET si esta configurado
+        value = request.headers.get("X-SQL-Profile")
+        return value is not None and (self.secret is None or hmac.compare_digest(value, self.secret))
+
+    def wanted(self):
+        return self.mode == "always" or self.authorized()
+
+    def start(self):
+        if self.wanted():
+            g.sql_profile = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['profile_start'].pop()
+        if conn.info.get('explaining'):
+            return
+        profiling = has_request_context() and 'sql_profile' in g
+        slow = self.slow_ms is not None and elapsed * 1000 >= self.slow_ms
+        if not (profiling or slow):
+            return
+
+        entry = {
+            "statement": statement,
+            "ms": round(elapsed * 1000, 3),
+            "rows": cursor.rowcount if cursor.rowcount >= 0 else None,
+            "executemany": executemany,
+            "call_site": call_site(),
+        }
+        # Sin contexto de app no hay logger donde dejar el plan: no se lanza el EXPLAIN
+        if slow and not executemany and has_app_context() \
+                and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            entry["plan"] = explain(conn, statement, parameters)
+            current_app.logger.warning("Slow query %.1fms en %s (%s)\n%s\nplan:\n%s", entry["ms"],
+                                       request.path if has_request_context() else "-",
+                                       entry["call_site"], statement, entry["plan"])
+        if profiling:
+            g.sql_profile.append(entry)
+
+    def summary(self, statements):
+        shapes = {}
+        for entry in statements:
+            shape = statement_shape(entry["statement"])
+            group = shapes.setdefault(shape, {"statement": shape, "count": 0, "ms": 0.0, "call_sites": set()})
+            group["count"] += 1
+            group["ms"] += entry["ms"]
+            if entry["call_site"]:
+                group["call_sites"].add(entry["call_site"])
+        n_plus_one = [
+            {**group, "ms": round(group["ms"], 3), "call_sites": sorted(group["call_sites"])}
+            for group in shapes.values() if group["count"] >= self.n_plus_one]
+        return {
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "queries": len(statements),
+            "db_ms": round(sum(entry["ms"] for entry in statements), 3),
+            "statements": statements,
+            "n_plus_one": n_plus_one,
+        }
+
+    def finish(self, response):
+        statements = g.pop('sql_profile', None)
+        if statements is None:
+            return response
+        profile = self.summary(statements)
+        profile["status"] = response.status_code
+        self.profiles.append(profile)
+
+        response.headers.add("Server-Timing",
+                             f'db;dur={profile["db_ms"]};desc="{profile["queries"]} queries"')
+        if profile["n_plus_one"]:
+            response.headers["X-SQL-N-Plus-One"] = str(len(profile["n_plus_one"]))
+            for group in profile["n_plus_one"]:
+                current_app.logger.warning("Posible N+1 en %s: %d veces %s (%s)", profile["path"],
+                                           group["count"], group["statement"], ", ".join(group["call_sites"]))
+        current_app.logger.info("SQL %s %s: %d queries, %.1fms", profile["method"], profile["path"],
+                                profile["queries"], profile["db_ms"])
+        return response
+
+    def list_profiles(self):
+        # Los perfiles llevan el SQL y los puntos del codigo que lo lanzan
+        if not self.authorized():
+            return jsonify({"message": "Se requiere la cabecera X-SQL-Profile"}), 403
+        return jsonify(list(self.profiles)), 200
+
+
+profiler = SQLProfiler()
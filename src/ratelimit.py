@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify, current_app
+from flask_jwt_extended import decode_token
+from metrics import registry
+
+# Rate limiting con token bucket. Cada limite es "N/unidad" (second, minute, hour):
+# el bucket admite rafagas de N peticiones y se rellena a N por unidad de tiempo.
+# El backend por defecto es de memoria del worker; con varios workers cada uno
+# cuenta por separado salvo que se configure un backend compartido.
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+ratelimit_rejected_total = registry.counter(
+    "ratelimit_rejected_total", "Peticiones rechazadas con 429 por endpoint y limite")
+
+
+def parse_rate(value):
+    # "10/minute" -> (tokens por segundo, capacidad del bucket)
+    count, _, unit = value.partition("/")
+    return int(count) / UNITS[unit.strip().rstrip("s")], int(count)
+
+
+class RateLimitBackend:
+    # Interfaz para un backend compartido (Redis con un script Lua, por ejemplo)
+
+    def consume(self, key, rate, burst, cost=1):
+        # Devuelve (permitido, segundos hasta que haya tokens suficientes)
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBuckets(RateLimitBackend):
+    # Los buckets se reparten entre varios locks por hash de la clave, asi las
+    # peticiones de clientes distintos no se serializan en un lock global
+
+    def __init__(self, max_keys=100000, stripes=64):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def consume(self, key, rate, burst, cost=1):
+        now = time.monotonic()
+        with self._locks[hash(key) % len(self._locks)]:
+            tokens, last, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            # full_at: cuando el bucket vuelve a estar lleno y la entrada sobra
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+
+        if len(self._buckets) > self.max_keys:
+            self.prune(now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def prune(self, now):
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at <= now:
+                self._buckets.pop(key, None)
+        # Si siguen sobrando se descartan los mas antiguos (se les perdona el limite)
+        for key in list(self._buckets)[:max(len(self._buckets) - self.max_keys, 0)]:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        self._buckets.clear()
+
+
+def jwt_subject(req=None):
+    # sub del JWT valido de la peticion, sin consultar la base de datos, o None
+    req = request if req is None else req
+    header = req.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        try:
+            return str(decode_token(header[7:])["sub"])
+        except Exception:
+            pass
+    return None
+
+
+def client_key(req=None):
+    # Usuario del JWT si lo hay, si no la IP
+    req = request if req is None else req
+    subject = jwt_subject(req)
+    return "user:" + subject if subject is not None else "ip:" + (req.remote_addr or "unknown")
+
+
+def too_many_requests(retry_after):
+    response = jsonify({"message": "Demasiadas peticiones, intentalo mas tarde"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+class RateLimiter:
+
+    def __init__(self, app=None):
+        self.backend = MemoryBuckets()
+        self.enabled = True
+        self.routes = {}
+        self.writes = None
+        self._rates = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        # Limite por endpoint (p.ej. "api.login") -> "N/unidad"
+        app.config.setdefault('RATELIMIT_ROUTES', {})
+        # Limite por defecto para POST/PUT/PATCH/DELETE sin entrada en RATELIMIT_ROUTES
+        app.config.setdefault('RATELIMIT_WRITES', None)
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 100000)
+        app.config.setdefault('RATELIMIT_BACKEND', None)
+
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        self.routes = app.config['RATELIMIT_ROUTES']
+        self.writes = app.config['RATELIMIT_WRITES']
+        self.backend = app.config['RATELIMIT_BACKEND'] or MemoryBuckets(app.config['RATELIMIT_MAX_KEYS'])
+        if self.enabled:
+            app.before_request(self.check_route)
+
+    def rate(self, value):
+        if value not in self._rates:
+            self._rates[value] = parse_rate(value)
+        return self._rates[value]
+
+    def hit(self, scope, value, key):
+        rate, burst = self.rate(value)
+        allowed, retry_after = self.backend.consume(f"{scope}:{key}", rate, burst)
+        if not allowed:
+            ratelimit_rejected_total.inc(endpoint=request.endpoint or "unmatched", limit=value)
+            return too_many_requests(retry_after)
+        return None
+
+    def check_route(self):
+        value = self.routes.get(request.endpoint)
+        if value is None and request.method in ("POST", "PUT", "PATCH", "DELETE"):
+            value = self.writes
+        if value is None or request.method == "OPTIONS":
+            return None
+        return self.hit(request.endpoint, value, client_key())
+
+    def limit(self, value, key):
+        # Limite adicional con otra clave, p.ej. el email en /login contra fuerza bruta
+        # repartida entre muchas IPs. key() devuelve None para no aplicar el limite.
+        # value es "N/unidad" o el nombre de una clave de configuracion de la app.
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                scope_key = key() if self.enabled else None
+                if scope_key is not None:
+                    rate = current_app.config.get(value, value)
+                    rejected = self.hit(f"{request.endpoint}:custom", rate, scope_key)
+                    if rejected is not None:
+                        return rejected
+                return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+limiter = RateLimiter()
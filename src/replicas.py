@@ -0,0 +1,185 @@
+import itertools
+import threading
+import time
+from flask import g, request, has_request_context, current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql.dml import UpdateBase
+from cache import LRUCache
+from metrics import registry
+from ratelimit import jwt_subject
+
+# Replicas de lectura. En una peticion GET/HEAD las SELECT van a una replica sana
+# (round-robin) cuyo retraso medido no pase de REPLICA_MAX_LAG; las escrituras y el
+# resto de metodos van al primario. Tras escribir, solo la sesion que escribio queda
+# fijada al primario REPLICA_PIN_SECONDS para leer lo que acaba de escribir: por cookie
+# y, si la peticion trae JWT, por su sub (para clientes sin cookies). La IP no sirve de
+# clave: detras de un balanceador la comparten todos los clientes. Los demas clientes
+# (y los caches de respuesta) pueden ver datos con hasta REPLICA_MAX_LAG de retraso.
+
+PIN_COOKIE = "db_primary_until"
+
+# Retraso en segundos; en el resto de motores solo se comprueba que la replica responde
+LAG_QUERIES = {
+    "postgresql": "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                  "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                  "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END",
+}
+
+db_reads_routed_total = registry.counter(
+    "db_reads_routed_total", "Peticiones de lectura por base de datos (primary o bind de la replica)")
+
+
+class Replica:
+
+    def __init__(self, key):
+        self.key = key
+        # Hasta el primer chequeo no se sabe si esta al dia: se lee del primario
+        self.healthy = False
+        self.lag = None
+        self.checked_at = None
+        self.error = None
+
+    def available(self, max_lag, max_age):
+        return (self.healthy and self.checked_at is not None
+                and time.monotonic() - self.checked_at <= max_age
+                and (self.lag or 0) <= max_lag)
+
+
+class RoutingSession(Session):
+    # Session de Flask-SQLAlchemy que consulta a replicas antes de elegir el bind
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            key = replicas.route(self, clause)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+
+    def __init__(self, app=None):
+        self.replicas = []
+        self.max_lag = 5.0
+        self.interval = 5.0
+        self.pin_seconds = 5
+        self.pins = LRUCache(10000)
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._checker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Antes de db.init_app: cada replica se registra como un bind de SQLALCHEMY_BINDS
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        app.config.setdefault('REPLICA_MAX_LAG', 5)
+        app.config.setdefault('REPLICA_CHECK_INTERVAL', 5)
+        app.config.setdefault('REPLICA_PIN_SECONDS', 5)
+        app.config.setdefault('REPLICA_MAX_PINS', 10000)
+
+        self.max_lag = app.config['REPLICA_MAX_LAG']
+        self.interval = app.config['REPLICA_CHECK_INTERVAL']
+        self.pin_seconds = app.config['REPLICA_PIN_SECONDS']
+        self.pins = LRUCache(app.config['REPLICA_MAX_PINS'])
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        # Una app nueva (create_app otra vez) tiene sus replicas y su propio hilo de salud
+        self.replicas = []
+        self._checker = None
+        for index, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+            replica = Replica(f"replica_{index}")
+            binds[replica.key] = uri
+            self.replicas.append(replica)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+        if self.replicas:
+            app.before_request(self.start_request)
+            app.after_request(self.pin_after_write)
+
+    def start_request(self):
+        self.start(current_app._get_current_object())
+        g.db_primary = request.method not in ("GET", "HEAD") or self.pinned(request)
+
+    def route(self, session, clause):
+        # Devuelve el bind de la replica o None para usar el primario
+        if not self.replicas or not has_request_context() or 'db_primary' not in g:
+            return None
+        if session._flushing or isinstance(clause, UpdateBase):
+            # El resto de la peticion lee del primario lo que acaba de escribir
+            g.db_wrote = g.db_primary = True
+            return None
+        if not getattr(clause, "is_select", False):
+            return None
+        if 'db_replica' not in g:
+            g.db_replica = None if g.db_primary else self.pick()
+            db_reads_routed_total.inc(target=g.db_replica or "primary")
+        return None if g.db_primary else g.db_replica
+
+    def pick(self):
+        healthy = [replica for replica in self.replicas if replica.available(self.max_lag, self.interval * 3)]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)].key
+
+    def pinned(self, req):
+        until = req.cookies.get(PIN_COOKIE)
+        try:
+            if until and float(until) > time.time():
+                return True
+        except ValueError:
+            pass
+        subject = jwt_subject(req)
+        return subject is not None and self.pins.get(subject) is not None
+
+    def pin_after_write(self, response):
+        if g.get('db_wrote'):
+            subject = jwt_subject()
+            if subject is not None:
+                self.pins.set(subject, True, self.pin_seconds)
+            response.set_cookie(PIN_COOKIE, str(int(time.time()) + self.pin_seconds),
+                                max_age=self.pin_seconds, httponly=True, samesite="Lax")
+        return response
+
+    def start(self, app):
+        # Un hilo por worker, arrancado en la primera peticion (despues del fork de gunicorn)
+        if self._checker is None and self.replicas:
+            with self._lock:
+                if self._checker is None:
+                    self._checker = threading.Thread(target=self.run_checks, args=(app, self.replicas),
+                                                     name="replica-health", daemon=True)
+                    self._checker.start()
+
+    def run_checks(self, app, replica_list):
+        # Termina cuando init_app sustituye la lista de replicas
+        while self.replicas is replica_list:
+            with app.app_context():
+                self.check_all(replica_list)
+            time.sleep(self.interval)
+
+    def check_all(self, replica_list=None):
+        engines = current_app.extensions['sqlalchemy'].engines
+        for replica in self.replicas if replica_list is None else replica_list:
+            self.check(replica, engines[replica.key])
+
+    def check(self, replica, engine):
+        try:
+            with engine.connect() as conn:
+                lag = float(conn.execute(text(LAG_QUERIES.get(engine.dialect.name, "SELECT 0"))).scalar() or 0)
+        except Exception as error:
+            if replica.healthy or replica.checked_at is None:
+                current_app.logger.warning("Replica %s no disponible: %s", replica.key, error)
+            replica.healthy, replica.error = False, str(error)
+        else:
+            if lag > self.max_lag and (replica.lag or 0) <= self.max_lag:
+                current_app.logger.warning("Replica %s con %.1fs de retraso, se lee del primario", replica.key, lag)
+            replica.healthy, replica.lag, replica.error = True, lag, None
+        replica.checked_at = time.monotonic()
+
+    def stats(self):
+        return [{"bind": replica.key, "healthy": replica.healthy, "lag": replica.lag, "error": replica.error,
+                 "available": replica.available(self.max_lag, self.interval * 3)} for replica in self.replicas]
+
+
+replicas = ReplicaRouter()
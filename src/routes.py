@@ -0,0 +1,955 @@
+"""
+Endpoints de la API, create_app (app.py) registra este blueprint
+"""
+from flask import Blueprint, request, jsonify, current_app, g
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, current_user
+from utils import (
+    APIException, generate_sitemap, get_page_args, wants_stream, stream_ndjson, get_batch_items, batch_response,
+    conditional, get_fieldset)
+from cache import cache, user_favorites
+from catalog import catalog
+from passwords import passwords
+from auth import auth
+from ratelimit import limiter
+from search import SEARCHABLE, search, filter_prefix
+from dataloader import load
+from models import (
+    db, User, Character, Planet, Favorites, favorites_with_items, users_with_favorites, keyset_page,
+    is_unique_violation, bulk_insert, bulk_update, bulk_delete, detach_favorites, existing_ids,
+    resource_version, collection_version, favorites_version, column_rows,
+    favorite_deltas, bump_favorite_counters, delete_favorite_counters, favorite_count, top_favorited)
+from sqlalchemy import select
+import re
+
+api = Blueprint('api', __name__)
+
+
+@api.route('/signup', methods=['POST'])
+def signup():
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return jsonify({"msg": "Correo y contraseña son requeridos"}), 400
+
+    user = User.query.filter_by(email=email).first()
+    if user:
+        return jsonify({"msg": "El usuario ya existe"}), 400
+
+    hashed_password = passwords.hash(password)
+
+    new_user = User(name=data.get('name') or email, email=email, password=hashed_password)
+    db.session.add(new_user)
+    db.session.commit()
+
+    return jsonify({"msg": "Usuario creado con éxito"}), 201
+
+def login_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+@api.route('/login', methods=['POST'])
+@limiter.limit('RATELIMIT_LOGIN_PER_EMAIL', key=login_email)
+def login():
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return jsonify({"msg": "Correo y contraseña son requeridos"}), 400
+
+
+    user = User.query.filter_by(email=email).first()
+    if not user or not passwords.verify(password, user.password):
+        return jsonify({"msg": "Correo o contraseña incorrectos"}), 401
+
+    # Rehash transparente si cambio BCRYPT_ROUNDS o la contraseña estaba en texto plano
+    if passwords.needs_rehash(user.password):
+        user.password = passwords.hash(password)
+        db.session.commit()
+
+    # Crear JWT
+    access_token = create_access_token(identity=email)
+    return jsonify({"access_token": access_token}), 200
+
+@api.route('/private', methods=['GET'])
+@jwt_required()
+def private():
+    # Validar el usuario
+    current_user = get_jwt_identity()
+    return jsonify({"msg": f"Bienvenido {current_user}, esta es una página privada."}),200
+
+def current_user_id():
+    # La identidad del token es el email; auth.load_user ya lo resolvio (cacheado)
+    return current_user.id
+
+@api.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    auth.revoke(get_jwt())
+    return jsonify({"msg": "Sesión cerrada con éxito"}), 200
+
+
+
+
+# Handle/serialize errors like a JSON object
+
+
+@api.app_errorhandler(APIException)
+def handle_invalid_usage(error):
+    return jsonify(error.to_dict()), error.status_code
+
+# generate sitemap with all your endpoints
+
+
+def validar_password(password):
+    if len(password) < 3:
+        return jsonify({"False": "La contraseña debe tener al menos 4 caracteres"})
+
+    if not password[0].isupper():
+        return jsonify({"False": "La contraseña debe comenzar con una letra mayúscula"})
+
+    if not re.search(r'[@!#%+]', password):
+        return jsonify({"False": "La contraseña debe contener al menos un símbolo especial (@, !, #, %, +)"})
+
+    return True
+
+
+def validar_email(email):
+    patron = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+    if re.match(patron, email):
+        return True
+    return False
+
+
+@api.route('/')
+def sitemap():
+    return generate_sitemap(current_app)
+
+
+@api.route('/cache/stats')
+def cache_stats():
+    return jsonify({**cache.stats(), "user_favorites": user_favorites.stats(), "catalog": catalog.stats()}), 200
+
+
+@api.route('/users', methods=['GET'])
+def get_all_users():
+    fields, expand = get_fieldset()
+    page = get_page_args()
+    if page:
+        users, next_cursor = keyset_page(
+            users_with_favorites(fields, expand).filter_by(is_active=True), User, *page)
+        return jsonify({
+            "results": [user.serialize(fields, expand) for user in users],
+            "next_cursor": next_cursor
+        }), 200
+
+    users = users_with_favorites(fields, expand).all()
+
+    if not users:
+        return jsonify({"message": "No existen usuarios"}), 404
+
+    user_serialize = [user.serialize(fields, expand) for user in users if user.is_active]
+    return jsonify(user_serialize), 200
+
+
+@api.route('/user', methods=['POST'])
+def add_new_user():
+    data = request.json
+
+    name = data.get("name", "")
+    email = data.get("email", "")
+    password = data.get("password", "")
+
+    if User.query.filter_by(email=email).first():
+        return jsonify({"message": "El email ya está registrado"}), 409
+
+    if not name:
+        return jsonify({"message": "El usuario debe tener un nombre"}), 400
+    if not email:
+        return jsonify({"message": "El usuario debe tener un email"}), 400
+    if not validar_email(email):
+        return jsonify({"message": "El email no tiene un formato válido"}), 406
+    if not password:
+        return jsonify({"message": "El usuario debe tener una contraseña"}), 400
+
+
+    user = User(
+        name=name,
+        email=email,
+        password=passwords.hash(password)
+    )
+    try:
+        db.session.add(user)
+        db.session.commit()
+        return jsonify({"message": "Usuario creado con éxito"}), 201
+    except Exception as e:
+        return jsonify({"message": "Error al crear el usuario", "error": str(e)}), 500
+
+
+@api.route('/user/<int:user_id>', methods=['DELETE'])
+def delete_user(user_id):
+    exist = load(User, user_id)
+
+    if not exist:
+        return jsonify({"message": "El usuario no existe"}), 404
+
+    email = exist.email
+    try:
+        delete_favorite_counters("user", [user_id])
+        db.session.delete(exist)
+        db.session.commit()
+        user_favorites.invalidate(user_id)
+        auth.forget_user(email)
+        return jsonify({"message": "El usuario a sido eliminado con exito"}), 200
+    except Exception as e:
+        return jsonify({"message": "Error al eliminar el usuario", "error": str(e)}), 500
+
+
+# Enpoints de Characters
+
+
+@api.route('/people')
+@catalog.serves("people")
+@cache.cached("people")
+@conditional(lambda: collection_version(Character))
+def get_all_people():
+    fields, _ = get_fieldset()
+    query = filter_prefix(Character.query, Character, {
+        "name": request.args.get("name"),
+        "specie": request.args.get("specie")
+    })
+    query, serialize = column_rows(query, Character, fields)
+    if wants_stream():
+        return stream_ndjson(query.order_by(Character.id), serialize)
+
+    page = get_page_args()
+    if page:
+        characters, next_cursor = keyset_page(query, Character, *page)
+        return jsonify({
+            "results": [serialize(char) for char in characters],
+            "next_cursor": next_cursor
+        }), 200
+
+    characters = query.all()
+
+    if not characters:
+        return jsonify({"message": "No se encuentran characters"}), 404
+
+    char_serialize = [serialize(char) for char in characters]
+    return jsonify(char_serialize), 200
+
+
+@api.route('/people/<int:people_id>')
+@catalog.serves("people")
+@cache.cached("people")
+@conditional(lambda people_id: resource_version(Character, people_id))
+def get_people(people_id):
+    character = load(Character, people_id)
+
+    if not character:
+        return jsonify({"message": "Not found"}), 404
+
+    return jsonify(character.serialize(get_fieldset()[0])), 200
+
+
+@api.route('/people', methods=["POST"])
+@cache.invalidates("people")
+def add_new_people():
+    data = request.json
+    name = data.get("name", "").strip()
+    specie = data.get("specie", "").strip()
+
+    if not name:
+        return jsonify({"message": "El personaje debe tener un nombre"}), 400
+    if not specie:
+        return jsonify({"message": "El personaje debe ser de una especie"}), 400
+    try:
+        new_character = Character(name=name, specie=specie)
+        db.session.add(new_character)
+        db.session.commit()
+        return jsonify({
+            "message": "Character agregado con éxito",
+            "new_character": new_character.serialize()
+        }), 201
+    except Exception as e:
+        return jsonify({"message": "Error al crear el character", "error": str(e)}), 500
+
+
+@api.route('/people/<int:people_id>', methods=['PUT'])
+@cache.invalidates("people")
+def edit_people(people_id):
+    data = request.json
+    name = data.get("name", "").strip()
+    specie = data.get("specie", "").strip()
+
+    character = load(Character, people_id)
+
+    if not character:
+        return jsonify({"message": "Character no encontrado"}), 404
+
+    if not name:
+        return jsonify({"message": "El personaje debe tener un nombre"}), 400
+    if not specie:
+        return jsonify({"message": "El personaje debe tener una especie"}), 400
+
+    character.name = name
+    character.specie = specie
+
+    try:
+        db.session.commit()
+        return jsonify({
+            "message": "Personaje actualizado correctamente",
+            "character": character.serialize()
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error al actualizar", "error": str(e)}), 500
+
+
+@api.route('/people/<int:id>', methods=["DELETE"])
+@cache.invalidates("people")
+def delete_people(id):
+    exist = load(Character, id)
+
+    if not exist:
+        return jsonify({"message": "Este Character no existe"}), 404
+
+    # El ORM deja a NULL id_character en sus favoritos; su contador desaparece con el
+    delete_favorite_counters("character", [id])
+    db.session.delete(exist)
+    db.session.commit()
+    return jsonify({
+        "message": "Character eliminado con exito",
+        "character": exist.serialize()
+    }), 200
+
+
+@api.route('/favorite/people/<int:id>')
+@jwt_required()
+def is_favorite_people(id):
+    entry = get_user_favorites(current_user_id())
+    return jsonify({"id": id, "favorite": ("character", id) in entry.keys}), 200
+
+
+@api.route('/favorite/people/<int:id>', methods=["POST"])
+@jwt_required()
+def add_favorit_people(id):
+    id_user = current_user_id()
+    try:
+        character = load(Character, id)
+        if not character:
+            return jsonify({"message": "Character no encontrado"}), 404
+
+        favorite = Favorites(
+            id_character=id,
+            id_user=id_user,
+            id_planet=None,
+            name=character.name,  # Hardcodear el nombre del Character en la tabla Favorites
+            tipo="character"      # Hardcodear el tipo como character en la tabla Favorites
+        )
+        db.session.add(favorite)
+        bump_favorite_counters(favorite_deltas([favorite]))
+        db.session.commit()
+        user_favorites.invalidate(id_user)
+        return jsonify(favorite.serialize()), 201
+    except Exception as e:
+        db.session.rollback()
+        # El duplicado lo detecta el indice unico, sin leer antes de escribir
+        if is_unique_violation(e):
+            return jsonify({"message": "Already exist"}), 409
+        return jsonify({"message": "Error al agregar el favorito", "error": str(e)}), 500
+
+
+@api.route('/favorite/people/<int:id>', methods=["DELETE"])
+@jwt_required()
+def delete_favorite_people(id):
+    id_user = current_user_id()
+    favorite = Favorites.query.filter_by(id_character=id, id_user=id_user).first()
+
+    if not favorite:
+        return jsonify({"message": "Favorite not found"}), 404
+
+    db.session.delete(favorite)
+    bump_favorite_counters(favorite_deltas([favorite], -1))
+    db.session.commit()
+    user_favorites.invalidate(id_user)
+    return jsonify({"message": "Favorite deleted successfully"}), 200
+
+
+# Enpoints de Planetas
+
+
+@api.route('/planets')
+@catalog.serves("planets")
+@cache.cached("planets")
+@conditional(lambda: collection_version(Planet))
+def get_all_planets():
+    fields, _ = get_fieldset()
+    query = filter_prefix(Planet.query, Planet, {"name": request.args.get("name")})
+    query, serialize = column_rows(query, Planet, fields)
+    if wants_stream():
+        return stream_ndjson(query.order_by(Planet.id), serialize)
+
+    page = get_page_args()
+    if page:
+        planets, next_cursor = keyset_page(query, Planet, *page)
+        return jsonify({
+            "results": [serialize(planet) for planet in planets],
+            "next_cursor": next_cursor
+        }), 200
+
+    planets = query.all()
+
+    if not planets:
+        return jsonify({"message": "No se encontraron planetas"}), 404
+
+    planet_serialize = [serialize(planet) for planet in planets]
+    return jsonify(planet_serialize), 200
+
+
+@api.route('/planets/<int:planet_id>')
+@catalog.serves("planets")
+@cache.cached("planets")
+@conditional(lambda planet_id: resource_version(Planet, planet_id))
+def get_planet(planet_id):
+    planet = load(Planet, planet_id)
+
+    if not planet:
+        return jsonify({"message": "Not found"}), 404
+
+    return jsonify(planet.serialize(get_fieldset()[0])), 200
+
+
+@api.route('/planets', methods=["POST"])
+@cache.invalidates("planets")
+def add_new_planet():
+    data = request.json
+    name = data.get("name", "").strip()
+
+    if not name:
+        return jsonify({"message": "El planeta debe tener un nombre"}), 400
+
+    try:
+        new_planet = Planet(name=name)
+        db.session.add(new_planet)
+        db.session.commit()
+        return jsonify({
+            "message": "Planeta agregado con éxito",
+            "new_planet": new_planet.serialize()
+        }), 201
+    except Exception as e:
+        return jsonify({"message": "Error al crear el planeta", "error": str(e)}), 500
+
+
+@api.route('/planets/<int:planet_id>', methods=["PUT"])
+@cache.invalidates("planets")
+def edit_planet(planet_id):
+    data = request.get_json()
+
+    if not data:
+        return jsonify({"message", "Not found"}), 404
+
+    name = data.get("name", "").strip()
+
+    if not name:
+        return jsonify({"message": "El planeta debe tener un name"}), 400
+
+    planet = load(Planet, planet_id)
+
+    if not planet:
+        return jsonify({"message": "El planeta no existe"}), 404
+
+    planet.name = name
+
+    try:
+        db.session.commit()
+        return jsonify({
+            "message": "Planeta actualizado correctamente",
+            "planet": planet.serialize()
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": "Error al actualizar", "error": str(e)}), 500
+
+
+@api.route('/planets/<int:id>', methods=["DELETE"])
+@cache.invalidates("planets")
+def delete_planet(id):
+    exist = load(Planet, id)
+
+    if not exist:
+        return jsonify({"message": "Este Planeta no existe"}), 404
+
+    delete_favorite_counters("planet", [id])
+    db.session.delete(exist)
+    db.session.commit()
+    return jsonify({
+        "message": "Plneta eliminado con exito",
+        "planet": exist.serialize()
+    }), 200
+
+
+@api.route('/favorite/planets/<int:id>')
+@jwt_required()
+def is_favorite_planet(id):
+    entry = get_user_favorites(current_user_id())
+    return jsonify({"id": id, "favorite": ("planet", id) in entry.keys}), 200
+
+
+@api.route('/favorite/planets/<int:id>', methods=["POST"])
+@jwt_required()
+def add_favorite_planet(id):
+    id_user = current_user_id()
+    try:
+        planet = load(Planet, id)
+        if not planet:
+            return jsonify({"message": "Planet no encontrado"}), 404
+        favorite = Favorites(
+                id_character=None,
+                id_user=id_user,
+                id_planet=id,
+                name=planet.name,  # Harcodear el nombre del Planeta en la tabla Favorites
+                tipo="planet"      # Harcodear el tipo como planet en la tabla Favorites
+            )
+        db.session.add(favorite)
+        bump_favorite_counters(favorite_deltas([favorite]))
+        db.session.commit()
+        user_favorites.invalidate(id_user)
+        return jsonify(favorite.serialize()), 200
+    except Exception as e:
+        db.session.rollback()
+        if is_unique_violation(e):
+            return jsonify({"message": "already exist"}), 409
+        return jsonify({"message": "Error al agregar planeta a favoritos", "error": str(e)}), 500
+
+
+@api.route('/favorite/planets/<int:id>', methods=["DELETE"])
+@jwt_required()
+def delete_favorite_peopl(id):
+    id_user = current_user_id()
+    exist = Favorites.query.filter_by(id_planet=id, id_user=id_user).first()
+    
+    if not exist:
+        return jsonify({"message": "Este Favorito no existe"}), 404
+
+    # Serializar antes de borrar: despues del commit la relacion planet ya no se puede cargar
+    serialized = exist.serialize()
+    db.session.delete(exist)
+    bump_favorite_counters(favorite_deltas([exist], -1))
+    db.session.commit()
+    user_favorites.invalidate(id_user)
+    return jsonify({
+        "message": "Plneta Favorite eliminado con exito",
+        "planet": serialized
+    }), 200
+
+
+@api.route('/favorite')
+@conditional(lambda: favorites_version())
+def get_all_favorites():
+    fields, expand = get_fieldset()
+    if wants_stream():
+        return stream_ndjson(favorites_with_items(fields, expand).order_by(Favorites.id),
+                             lambda fav: fav.serialize(fields, expand))
+
+    page = get_page_args()
+    if page:
+        favorites, next_cursor = keyset_page(favorites_with_items(fields, expand), Favorites, *page)
+        return jsonify({
+            "results": [fav.serialize(fields, expand) for fav in favorites],
+            "next_cursor": next_cursor
+        }), 200
+
+    favorites = favorites_with_items(fields, expand).all()
+
+    if not favorites:
+        return jsonify({"message": "No hay favoritos"}), 404
+    favorites_serialized = [fav.serialize(fields, expand) for fav in favorites]
+    return jsonify(favorites_serialized), 200
+
+def load_user_favorites(id_user):
+    if load(User, id_user) is None:
+        return None
+    favorites = favorites_with_items().filter_by(id_user=id_user).order_by(Favorites.id).all()
+    keys = [("character", fav.id_character) if fav.id_character else ("planet", fav.id_planet)
+            for fav in favorites]
+    return [fav.serialize() for fav in favorites], keys, favorites_version(Favorites.id_user == id_user)
+
+
+def get_user_favorites(id_user):
+    # Lista, conjunto (tipo, id) y version de los favoritos del usuario, desde user_favorites.
+    # Se guarda en g: @conditional y la vista la piden en la misma peticion y, con la
+    # cache desactivada, se cargaria dos veces
+    entries = g.setdefault('user_favorites', {})
+    if id_user not in entries:
+        entries[id_user] = user_favorites.get(id_user, lambda: load_user_favorites(id_user))
+    return entries[id_user]
+
+
+def user_favorites_version(id_user):
+    entry = get_user_favorites(id_user)
+    return entry.version if entry is not None else None
+
+
+@api.route('/users/<int:id>/favorites')
+@conditional(lambda id: user_favorites_version(id))
+def get_all_favorites_user(id):
+    entry = get_user_favorites(id)
+    if entry is None:
+        return jsonify({"message": "User not exist"}), 404
+
+    fields, expand = get_fieldset()
+    if fields or expand:
+        favorites = favorites_with_items(fields, expand).filter_by(id_user=id).order_by(Favorites.id).all()
+        favorites_serialized = [fav.serialize(fields, expand) for fav in favorites]
+    else:
+        favorites_serialized = entry.items
+    if not favorites_serialized:
+        return jsonify({"message": "No hay favoritos"}), 404
+    return jsonify(favorites_serialized), 200
+
+
+# Contadores de favoritos
+# Se leen de favorite_counters (una fila por item), sin COUNT sobre favorites.
+
+
+def get_top_limit():
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        raise APIException("limit debe ser un entero", status_code=400)
+    if not 1 <= limit <= 100:
+        raise APIException("limit debe estar entre 1 y 100", status_code=400)
+    return limit
+
+
+@api.route('/people/<int:people_id>/stats')
+def get_people_stats(people_id):
+    if load(Character, people_id) is None:
+        return jsonify({"message": "Not found"}), 404
+    return jsonify({"id": people_id, "favorites_count": favorite_count("character", people_id) or 0}), 200
+
+
+@api.route('/people/top')
+def get_top_people():
+    rows = top_favorited(Character, "character", get_top_limit())
+    return jsonify([row._asdict() for row in rows]), 200
+
+
+@api.route('/planets/top')
+def get_top_planets():
+    rows = top_favorited(Planet, "planet", get_top_limit())
+    return jsonify([row._asdict() for row in rows]), 200
+
+
+@api.route('/users/<int:id>/favorites/count')
+def get_user_favorites_count(id):
+    if load(User, id) is None:
+        return jsonify({"message": "User not exist"}), 404
+    return jsonify({"id_user": id, "count": favorite_count("user", id) or 0}), 200
+
+
+# Busqueda
+
+
+@api.route('/search')
+def search_catalog():
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"message": "Se requiere el parametro q"}), 400
+
+    kind = request.args.get("type")
+    if kind and kind not in SEARCHABLE:
+        return jsonify({"message": f"type debe ser uno de: {', '.join(SEARCHABLE)}"}), 400
+    kinds = [kind] if kind else list(SEARCHABLE)
+
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        offset = min(max(int(request.args.get("offset", 0)), 0), 1000)
+    except ValueError:
+        return jsonify({"message": "limit y offset deben ser enteros"}), 400
+
+    # Cada tipo devuelve sus mejores limit + offset + 1 y se mezclan por score
+    matches = []
+    for name in kinds:
+        matches.extend((name, item, score) for item, score in search(name, q, limit + offset + 1))
+    matches.sort(key=lambda match: -match[2])
+
+    results = [{
+        **item.serialize(),
+        "type": "character" if name == "people" else "planet",
+        "score": round(score, 4)
+    } for name, item, score in matches[offset:offset + limit]]
+    next_offset = offset + limit if len(matches) > offset + limit else None
+    return jsonify({"results": results, "next_offset": next_offset}), 200
+
+
+# Endpoints batch
+# Validan la lista completa, escriben en una sola transaccion y devuelven un
+# resultado por elemento en el mismo orden que la peticion.
+
+
+def clean_text(item, key):
+    value = item.get(key) if isinstance(item, dict) else None
+    return value.strip() if isinstance(value, str) else ""
+
+
+def validar_character(item):
+    if not clean_text(item, "name"):
+        return "El personaje debe tener un nombre"
+    if not clean_text(item, "specie"):
+        return "El personaje debe ser de una especie"
+    return None
+
+
+def validar_planet(item):
+    if not clean_text(item, "name"):
+        return "El planeta debe tener un nombre"
+    return None
+
+
+def get_batch_ids(items):
+    ids = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("id")
+        ids.append(item if isinstance(item, int) and not isinstance(item, bool) else None)
+    return ids
+
+
+def batch_create(model, items, validar, fields):
+    results = [None] * len(items)
+    rows, positions = [], []
+    for index, item in enumerate(items):
+        error = validar(item)
+        if error:
+            results[index] = {"index": index, "status": 400, "message": error}
+            continue
+        rows.append({field: clean_text(item, field) for field in fields})
+        positions.append(index)
+
+    if rows:
+        try:
+            new_ids = bulk_insert(model, rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": "Error en el batch", "error": str(e)}), 500
+        for index, row, new_id in zip(positions, rows, new_ids):
+            results[index] = {"index": index, "status": 201, "item": {"id": new_id, **row}}
+
+    return batch_response(results, 201)
+
+
+def batch_edit(model, items, validar, fields):
+    ids = get_batch_ids(items)
+    found = existing_ids(model, [id for id in ids if id is not None])
+
+    results = [None] * len(items)
+    rows, positions = [], []
+    for index, (item, id) in enumerate(zip(items, ids)):
+        error = "Se requiere un id" if id is None else validar(item)
+        if error:
+            results[index] = {"index": index, "status": 400, "message": error}
+        elif id not in found:
+            results[index] = {"index": index, "status": 404, "message": "No encontrado"}
+        else:
+            rows.append({"id": id, **{field: clean_text(item, field) for field in fields}})
+            positions.append(index)
+
+    if rows:
+        try:
+            bulk_update(model, rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": "Error en el batch", "error": str(e)}), 500
+        for index, row in zip(positions, rows):
+            results[index] = {"index": index, "status": 200, "item": row}
+
+    return batch_response(results)
+
+
+def batch_remove(model, tipo, items):
+    ids = get_batch_ids(items)
+    found = existing_ids(model, [id for id in ids if id is not None])
+
+    results = []
+    for index, id in enumerate(ids):
+        if id is None:
+            results.append({"index": index, "status": 400, "message": "Se requiere un id"})
+        elif id not in found:
+            results.append({"index": index, "status": 404, "message": "No encontrado"})
+        else:
+            results.append({"index": index, "status": 200, "id": id})
+
+    if found:
+        try:
+            # El DELETE de Core no pasa por el ORM: los favoritos se desligan a mano,
+            # como en el borrado individual (user_favorites se limpia con la cache del namespace)
+            detach_favorites(model, list(found))
+            delete_favorite_counters(tipo, list(found))
+            bulk_delete(model, list(found))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": "Error en el batch", "error": str(e)}), 500
+
+    return batch_response(results)
+
+
+@api.route('/people/batch', methods=["POST"])
+@cache.invalidates("people")
+def add_people_batch():
+    return batch_create(Character, get_batch_items(), validar_character, ("name", "specie"))
+
+
+@api.route('/people/batch', methods=["PATCH"])
+@cache.invalidates("people")
+def edit_people_batch():
+    return batch_edit(Character, get_batch_items(), validar_character, ("name", "specie"))
+
+
+@api.route('/people/batch', methods=["DELETE"])
+@cache.invalidates("people")
+def delete_people_batch():
+    return batch_remove(Character, "character", get_batch_items())
+
+
+@api.route('/planets/batch', methods=["POST"])
+@cache.invalidates("planets")
+def add_planets_batch():
+    return batch_create(Planet, get_batch_items(), validar_planet, ("name",))
+
+
+@api.route('/planets/batch', methods=["PATCH"])
+@cache.invalidates("planets")
+def edit_planets_batch():
+    return batch_edit(Planet, get_batch_items(), validar_planet, ("name",))
+
+
+@api.route('/planets/batch', methods=["DELETE"])
+@cache.invalidates("planets")
+def delete_planets_batch():
+    return batch_remove(Planet, "planet", get_batch_items())
+
+
+def get_favorite_targets(items):
+    # Cada elemento es {"id_character": n} o {"id_planet": n}
+    targets = []
+    for item in items:
+        target = None
+        if isinstance(item, dict):
+            for key, tipo in (("id_character", "character"), ("id_planet", "planet")):
+                value = item.get(key)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    target = (key, tipo, value)
+                    break
+        targets.append(target)
+    return targets
+
+
+def favorite_lookups(targets, id_user):
+    character_ids = [value for key, _, value in filter(None, targets) if key == "id_character"]
+    planet_ids = [value for key, _, value in filter(None, targets) if key == "id_planet"]
+
+    names = {
+        "id_character": dict(db.session.execute(
+            select(Character.id, Character.name).where(Character.id.in_(character_ids))).all()),
+        "id_planet": dict(db.session.execute(
+            select(Planet.id, Planet.name).where(Planet.id.in_(planet_ids))).all()),
+    }
+    current = {"id_character": {}, "id_planet": {}}
+    for fav in db.session.scalars(select(Favorites).where(
+            Favorites.id_user == id_user,
+            Favorites.id_character.in_(character_ids) | Favorites.id_planet.in_(planet_ids))):
+        if fav.id_character:
+            current["id_character"][fav.id_character] = fav.id
+        else:
+            current["id_planet"][fav.id_planet] = fav.id
+    return names, current
+
+
+@api.route('/favorite/batch', methods=["POST"])
+@jwt_required()
+def add_favorites_batch():
+    id_user = current_user_id()
+    targets = get_favorite_targets(get_batch_items())
+    names, current = favorite_lookups(targets, id_user)
+
+    results = [None] * len(targets)
+    rows, positions = [], []
+    for index, target in enumerate(targets):
+        if target is None:
+            results[index] = {"index": index, "status": 400, "message": "Se requiere id_character o id_planet"}
+            continue
+        key, tipo, value = target
+        if value not in names[key]:
+            results[index] = {"index": index, "status": 404, "message": "No encontrado"}
+        elif value in current[key]:
+            results[index] = {"index": index, "status": 409, "message": "Already exist"}
+        else:
+            current[key][value] = None
+            rows.append({
+                "id_user": id_user,
+                "id_character": value if key == "id_character" else None,
+                "id_planet": value if key == "id_planet" else None,
+                "name": names[key][value],
+                "tipo": tipo
+            })
+            positions.append(index)
+
+    if rows:
+        try:
+            new_ids = bulk_insert(Favorites, rows)
+            bump_favorite_counters(favorite_deltas(rows))
+            db.session.commit()
+            user_favorites.invalidate(id_user)
+        except Exception as e:
+            db.session.rollback()
+            # Otra peticion inserto alguno de estos favoritos entre la lectura y la escritura
+            if is_unique_violation(e):
+                return jsonify({"message": "Already exist", "error": str(e)}), 409
+            return jsonify({"message": "Error en el batch", "error": str(e)}), 500
+        for index, row, new_id in zip(positions, rows, new_ids):
+            results[index] = {"index": index, "status": 201, "item": {
+                "id": new_id, "tipo": row["tipo"], "name": row["name"], "id_user": row["id_user"]}}
+
+    return batch_response(results, 201)
+
+
+@api.route('/favorite/batch', methods=["DELETE"])
+@jwt_required()
+def delete_favorites_batch():
+    id_user = current_user_id()
+    targets = get_favorite_targets(get_batch_items())
+    _, current = favorite_lookups(targets, id_user)
+
+    results, ids, deleted = [], set(), []
+    for index, target in enumerate(targets):
+        if target is None:
+            results.append({"index": index, "status": 400, "message": "Se requiere id_character o id_planet"})
+            continue
+        key, _, value = target
+        if value not in current[key]:
+            results.append({"index": index, "status": 404, "message": "Favorite not found"})
+        else:
+            if current[key][value] not in ids:
+                deleted.append({"id_user": id_user, key: value})
+            ids.add(current[key][value])
+            results.append({"index": index, "status": 200, "id": current[key][value]})
+
+    if ids:
+        try:
+            bulk_delete(Favorites, list(ids))
+            bump_favorite_counters(favorite_deltas(deleted, -1))
+            db.session.commit()
+            user_favorites.invalidate(id_user)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"message": "Error en el batch", "error": str(e)}), 500
+
+    return batch_response(results)
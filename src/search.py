@@ -0,0 +1,108 @@
+import re
+from sqlalchemy import select, func, case, text, inspect, literal, column
+from models import db, Character, Planet
+from dataloader import load_many
+
+# Busqueda sobre characters y planets. Cada base de datos usa su indice:
+# - postgresql: indices GIN pg_trgm sobre name/specie (ILIKE y similarity)
+# - sqlite: tablas FTS5 character_fts/planet_fts mantenidas por triggers
+# - resto (o sqlite sin migrar): ILIKE sin indice
+# Los indices y tablas se crean en la migracion c5b2f8e19a03.
+
+SEARCHABLE = {
+    "people": (Character, ("name", "specie"), "character_fts"),
+    "planets": (Planet, ("name",), "planet_fts"),
+}
+
+_fts_tables = {}
+
+
+def backend():
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        return "trigram"
+    if engine.dialect.name == "sqlite":
+        if engine.url not in _fts_tables:
+            _fts_tables[engine.url] = set(inspect(engine).get_table_names())
+        if all(fts in _fts_tables[engine.url] for _, _, fts in SEARCHABLE.values()):
+            return "fts5"
+    return "like"
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fts_match(value, columns=None, anchored=False):
+    # Cada palabra se busca como prefijo; las comillas evitan la sintaxis de FTS5.
+    # anchored: una sola frase que empieza en el primer token de la columna y cuya
+    # ultima palabra es prefijo, el equivalente de ILIKE 'valor%'
+    tokens = re.findall(r"\w+", value)
+    if not tokens:
+        return None
+    if anchored:
+        match = '^"' + " ".join(tokens) + '"*'
+    else:
+        match = " ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        match = "{" + " ".join(columns) + "} : (" + match + ")"
+    return match
+
+
+def filter_prefix(query, model, filters):
+    # Aplica ?name= / ?specie= como prefijo del valor completo de la columna, igual en
+    # todos los motores: ?name=Sky encuentra "Sky Guy" pero no "Luke Skywalker" (para
+    # buscar dentro del nombre esta /search). FTS5 ignora la puntuacion, asi que alli
+    # ?name=Obi Wan tambien encuentra "Obi-Wan".
+    kind = "people" if model is Character else "planets"
+    fts_table = SEARCHABLE[kind][2]
+    for field, value in filters.items():
+        value = (value or "").strip()
+        if not value:
+            continue
+        if backend() == "fts5":
+            match = fts_match(value, [field], anchored=True)
+            if match is None:
+                continue
+            matches = text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match_{field}") \
+                .bindparams(**{f"match_{field}": match}).columns(column("rowid"))
+            query = query.filter(model.id.in_(matches))
+        else:
+            query = query.filter(getattr(model, field).ilike(f"{escape_like(value)}%", escape="\\"))
+    return query
+
+
+def search(kind, q, limit, offset=0):
+    # Devuelve [(objeto, score)] ordenado por relevancia
+    model, columns, fts_table = SEARCHABLE[kind]
+    mode = backend()
+
+    if mode == "fts5":
+        match = fts_match(q)
+        if match is None:
+            return []
+        rows = db.session.execute(
+            text(f"SELECT rowid, bm25({fts_table}) AS rank FROM {fts_table} "
+                 f"WHERE {fts_table} MATCH :match ORDER BY rank, rowid LIMIT :limit OFFSET :offset"),
+            {"match": match, "limit": limit, "offset": offset}).all()
+        scores = {row.rowid: -row.rank for row in rows}
+    else:
+        pattern = f"%{escape_like(q)}%"
+        prefix = f"{escape_like(q)}%"
+        fields = [getattr(model, name) for name in columns]
+        is_prefix = case(*[(field.ilike(prefix, escape="\\"), 1.0) for field in fields], else_=0.0)
+        if mode == "trigram":
+            similarities = [func.similarity(field, q) for field in fields]
+            score = is_prefix + (func.greatest(*similarities) if len(similarities) > 1 else similarities[0])
+        else:
+            score = is_prefix + literal(0.5)
+        condition = fields[0].ilike(pattern, escape="\\")
+        for field in fields[1:]:
+            condition = condition | field.ilike(pattern, escape="\\")
+        rows = db.session.execute(
+            select(model.id, score.label("score")).where(condition)
+            .order_by(score.desc(), model.id).limit(limit).offset(offset)).all()
+        scores = {row.id: float(row.score) for row in rows}
+
+    items = load_many(model, scores).values()
+    return sorted(((item, scores[item.id]) for item in items), key=lambda pair: (-pair[1], pair[0].id))
@@ -1,4 +1,7 @@
-from flask import jsonify, url_for
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import jsonify, url_for, request, json, Response, stream_with_context, make_response
 
 class APIException(Exception):
     status_code = 400
@@ -15,13 +18,103 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def get_page_args(default_limit=20, max_limit=100, args=None):
+    # Devuelve (limit, after) si el cliente pide paginacion, o None para el listado completo
+    args = request.args if args is None else args
+    limit = args.get('limit')
+    after = args.get('after')
+    if limit is None and after is None:
+        return None
+
+    try:
+        limit = int(limit) if limit is not None else default_limit
+        after = int(after) if after is not None else None
+    except ValueError:
+        raise APIException("limit y after deben ser enteros", status_code=400)
+
+    if limit < 1:
+        raise APIException("limit debe ser mayor que 0", status_code=400)
+    return min(limit, max_limit), after
+
+def get_batch_items(max_items=1000):
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise APIException("Se espera una lista de elementos", status_code=400)
+    if len(items) > max_items:
+        raise APIException(f"Maximo {max_items} elementos por batch", status_code=413)
+    return items
+
+def batch_response(results, status_code=200):
+    # 207 si algun elemento fallo, cada resultado lleva su propio status
+    if any(result["status"] >= 400 for result in results):
+        status_code = 207
+    return jsonify({"results": results}), status_code
+
+def get_fieldset():
+    # ?fields=id,name limita las claves de la respuesta, ?expand=item embebe el character/planet de cada favorito
+    def parse(name):
+        value = request.args.get(name, '')
+        return {part.strip() for part in value.split(',') if part.strip()}
+
+    return parse('fields') or None, parse('expand')
+
+def wants_stream():
+    return (request.args.get('stream') == '1'
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+def stream_ndjson(query, serializer, batch_size=500):
+    # Una fila por linea; yield_per usa un cursor de servidor para que la memoria
+    # no crezca con la tabla y el primer byte salga antes de leer la ultima fila
+    def generate():
+        for item in query.yield_per(batch_size):
+            yield json.dumps(serializer(item)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def validators(full_path, version):
+    # (etag, last_modified) a partir del token de version del recurso
+    token, last_modified = version
+    etag = hashlib.sha1(f"{full_path}|{token}".encode('utf-8')).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return etag, last_modified
+
+def is_not_modified(req, etag, last_modified):
+    if req.if_none_match:
+        # Comparacion debil: la compresion marca el ETag como W/
+        return req.if_none_match.contains_weak(etag)
+    return (last_modified is not None and req.if_modified_since is not None
+            and last_modified <= req.if_modified_since)
+
+def conditional(get_version):
+    # Responde 304 sin llamar a la vista si el cliente ya tiene la version actual.
+    # get_version recibe los mismos argumentos que la vista y devuelve
+    # (token, last_modified) o None si el recurso no existe.
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            version = None if wants_stream() else get_version(**kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = validators(request.full_path, version)
+            not_modified = is_not_modified(request, etag, last_modified)
+
+            response = Response(status=304) if not_modified else make_response(f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
     return len(defaults) >= len(arguments)
 
 def generate_sitemap(app):
-    links = ['/admin/']
+    links = ['/admin/'] if app.config.get('ADMIN_MODE', 'eager') != 'off' else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
@@ -0,0 +1,47 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+
+# Cada app usa su propia base de datos sqlite en memoria, con el esquema de los modelos
+# (sin migraciones ni tablas FTS5: la busqueda usa el fallback ILIKE)
+TEST_CONFIG = {
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "MIGRATE_ENABLED": False,
+    "ADMIN_MODE": "off",
+    "RATELIMIT_ENABLED": False,
+    "BCRYPT_ROUNDS": 4,
+    "JWT_SECRET_KEY": "test-secret-key-with-at-least-32-bytes",
+}
+
+
+def make_app(**config):
+    app = create_app({**TEST_CONFIG, **config})
+    with app.app_context():
+        db.create_all(bind_key=None)
+    return app
+
+
+@pytest.fixture
+def app():
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(app, email="u@test.local"):
+    # Crea el usuario si no existe y devuelve la cabecera con un JWT suyo
+    from flask_jwt_extended import create_access_token
+    from models import User
+    with app.app_context():
+        if User.query.filter_by(email=email).first() is None:
+            db.session.add(User(name=email, email=email, password="x"))
+            db.session.commit()
+        return {"Authorization": "Bearer " + create_access_token(identity=email)}
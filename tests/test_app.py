@@ -0,0 +1,23 @@
+from sqlalchemy.pool import StaticPool
+from app import create_app
+from models import db
+from metrics import InstrumentedQueuePool
+from conftest import TEST_CONFIG
+
+
+def test_boots_on_in_memory_sqlite(client):
+    response = client.post("/people", json={"name": "Luke Skywalker", "specie": "Human"})
+    assert response.status_code == 201
+    assert client.get("/people/1").json == {"id": 1, "name": "Luke Skywalker", "specie": "Human"}
+
+
+def test_in_memory_sqlite_keeps_static_pool(app):
+    with app.app_context():
+        assert isinstance(db.engine.pool, StaticPool)
+
+
+def test_file_database_uses_instrumented_pool(tmp_path):
+    app = create_app({**TEST_CONFIG, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}"})
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"] == 5
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool)
@@ -0,0 +1,48 @@
+import time
+import pytest
+from auth import MemoryRevocationStore
+from conftest import make_app, auth_headers
+
+# /logout revoca el token por jti; los demas tokens del usuario siguen valiendo
+
+
+@pytest.fixture
+def client():
+    client = make_app().test_client()
+    assert client.post("/signup", json={"email": "u@test.local", "password": "Secreta!"}).status_code == 201
+    return client
+
+
+def login(client):
+    response = client.post("/login", json={"email": "u@test.local", "password": "Secreta!"})
+    assert response.status_code == 200
+    return {"Authorization": "Bearer " + response.json["access_token"]}
+
+
+def test_logout_revokes_only_that_token(client):
+    first, second = login(client), login(client)
+    assert client.get("/private", headers=first).status_code == 200
+    assert client.post("/logout", headers=first).status_code == 200
+    assert client.get("/private", headers=first).status_code == 401
+    assert client.post("/logout", headers=first).status_code == 401
+    assert client.get("/private", headers=second).status_code == 200
+
+
+def test_deleted_user_token_is_rejected():
+    client = make_app().test_client()
+    headers = auth_headers(client.application)
+    # La primera peticion deja el usuario en la cache de auth
+    assert client.get("/private", headers=headers).status_code == 200
+    assert client.delete("/user/1").status_code == 200
+    assert client.get("/private", headers=headers).status_code == 401
+
+
+def test_memory_store_drops_expired_and_oldest():
+    store = MemoryRevocationStore(max_entries=2)
+    now = time.time()
+    store.add("expired", now - 1)
+    assert "expired" not in store and len(store) == 0
+    for jti in ("a", "b", "c"):
+        store.add(jti, now + 60)
+    assert len(store) == 2 and store.evictions == 1
+    assert "a" not in store and "c" in store
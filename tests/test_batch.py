@@ -0,0 +1,91 @@
+import pytest
+from conftest import make_app, auth_headers
+
+# Endpoints batch: un resultado por elemento en el orden de la peticion, 207 si
+# alguno falla y una sola transaccion para los que se aplican
+
+
+@pytest.fixture
+def client():
+    return make_app().test_client()
+
+
+def statuses(response):
+    return [result["status"] for result in response.json["results"]]
+
+
+@pytest.mark.parametrize("kind, item", [
+    ("people", {"name": "Luke", "specie": "Humano"}),
+    ("planets", {"name": "Tatooine"}),
+])
+def test_batch_create_edit_delete(client, kind, item):
+    created = client.post(f"/{kind}/batch", json=[item, {**item, "name": "Otro"}])
+    assert created.status_code == 201
+    assert statuses(created) == [201, 201]
+    ids = [result["item"]["id"] for result in created.json["results"]]
+
+    edited = client.patch(f"/{kind}/batch", json=[{**item, "id": ids[0], "name": "Editado"}])
+    assert edited.status_code == 200
+    assert client.get(f"/{kind}/{ids[0]}").json["name"] == "Editado"
+
+    deleted = client.delete(f"/{kind}/batch", json=ids)
+    assert deleted.status_code == 200
+    assert statuses(deleted) == [200, 200]
+    assert client.get(f"/{kind}/{ids[0]}").status_code == 404
+
+
+def test_batch_partial_failure_is_207(client):
+    created = client.post("/people/batch", json=[{"name": "Luke", "specie": "Humano"}, {"name": "Sin especie"}])
+    assert created.status_code == 207
+    assert statuses(created) == [201, 400]
+    # El elemento valido se escribio
+    assert client.get("/people/1").json["name"] == "Luke"
+
+    edited = client.patch("/people/batch", json=[{"id": 1, "name": "Leia", "specie": "Humano"},
+                                                  {"id": 99, "name": "Han", "specie": "Humano"},
+                                                  {"name": "Sin id", "specie": "Humano"}])
+    assert edited.status_code == 207
+    assert statuses(edited) == [200, 404, 400]
+
+    deleted = client.delete("/people/batch", json=[1, 99, "x"])
+    assert deleted.status_code == 207
+    assert statuses(deleted) == [200, 404, 400]
+
+
+def test_batch_rejects_empty_or_invalid_body(client):
+    assert client.post("/people/batch", json=[]).status_code == 400
+    assert client.post("/people/batch", json={"name": "Luke"}).status_code == 400
+
+
+def test_favorites_batch(client):
+    headers = auth_headers(client.application)
+    client.post("/people/batch", json=[{"name": "Luke", "specie": "Humano"}])
+    client.post("/planets/batch", json=[{"name": "Tatooine"}])
+
+    added = client.post("/favorite/batch", headers=headers,
+                        json=[{"id_character": 1}, {"id_planet": 1}, {"id_planet": 99}, {"id_character": 1}, {}])
+    assert added.status_code == 207
+    assert statuses(added) == [201, 201, 404, 409, 400]
+    assert client.get("/favorite/people/1", headers=headers).json["favorite"] is True
+
+    removed = client.delete("/favorite/batch", headers=headers, json=[{"id_character": 1}, {"id_planet": 99}])
+    assert removed.status_code == 207
+    assert statuses(removed) == [200, 404]
+    assert client.get("/favorite/people/1", headers=headers).json["favorite"] is False
+
+
+@pytest.mark.parametrize("kind, target", [("people", "id_character"), ("planets", "id_planet")])
+def test_batch_delete_detaches_favorites(client, kind, target):
+    headers = auth_headers(client.application)
+    item = {"name": "Luke", "specie": "Humano"} if kind == "people" else {"name": "Tatooine"}
+    client.post(f"/{kind}/batch", json=[item, {**item, "name": "Otro"}])
+    assert client.post("/favorite/batch", headers=headers, json=[{target: 1}, {target: 2}]).status_code == 201
+    # Carga la cache de favoritos del usuario antes del borrado
+    assert len(client.get("/users/1/favorites").json) == 2
+
+    assert client.delete(f"/{kind}/batch", json=[1]).status_code == 200
+    for path in ("/favorite", "/users", "/users/1/favorites"):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.get_data(as_text=True))
+    # Igual que el borrado individual: el favorito queda desligado, sin item
+    assert [fav.get("name") for fav in client.get("/users/1/favorites").json] == [None, "Otro"]
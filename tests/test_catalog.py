@@ -0,0 +1,75 @@
+import pytest
+from flask import request
+from models import db, Character
+from catalog import catalog, Catalog
+from json_provider import orjson, msgspec
+from conftest import make_app
+
+# El snapshot del catalogo tiene que responder los mismos bytes que la vista que va
+# a la base de datos, con cualquier backend JSON
+
+BACKENDS = [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(orjson is None, reason="orjson no instalado")),
+    pytest.param("msgspec", marks=pytest.mark.skipif(msgspec is None, reason="msgspec no instalado")),
+]
+
+PATHS = ("/people", "/people?limit=2", "/people?limit=2&after=2", "/people/2")
+
+
+@pytest.fixture(autouse=True)
+def no_refresher(monkeypatch):
+    # El hilo de refresco no hace falta: los tests llaman a refresh directamente
+    monkeypatch.setattr(catalog, "start", lambda app: None)
+
+
+def seed(app, names):
+    with app.app_context():
+        db.session.add_all(Character(name=name, specie="Humano") for name in names)
+        db.session.commit()
+        for kind in catalog.models:
+            catalog.refresh(kind)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshot_bytes_match_database(backend):
+    app = make_app(CATALOG_SNAPSHOT=True, CACHE_ENABLED=False, JSON_BACKEND=backend)
+    seed(app, ["Luke", "Leia", "Han", "Chewbacca", "Réy"])
+    client = app.test_client()
+    for path in PATHS:
+        with app.test_request_context(path):
+            assert catalog.respond("people", request, request.view_args.get("people_id")) is not None
+        from_snapshot = client.get(path)
+        catalog.enabled = False
+        try:
+            from_database = client.get(path)
+        finally:
+            catalog.enabled = True
+        assert from_snapshot.status_code == from_database.status_code == 200
+        assert from_snapshot.get_data() == from_database.get_data(), path
+
+
+def test_debug_json_backend_skips_snapshot():
+    # Con el json estandar en debug jsonify indenta; el snapshot compacto no sirve
+    app = make_app(CATALOG_SNAPSHOT=True, CACHE_ENABLED=False, JSON_BACKEND="json", DEBUG=True)
+    seed(app, ["Luke", "Leia"])
+    with app.test_request_context("/people"):
+        assert catalog.respond("people", request) is None
+    assert app.test_client().get("/people").get_data().startswith(b"[\n  {")
+
+
+def test_new_app_does_not_serve_previous_snapshot():
+    first = make_app(CATALOG_SNAPSHOT=True, CACHE_ENABLED=False)
+    seed(first, ["Luke"])
+    Catalog.start(catalog, first)
+    refresher = catalog._refresher
+
+    second = make_app(CATALOG_SNAPSHOT=True, CACHE_ENABLED=False)
+    with second.app_context():
+        db.session.add(Character(name="Leia", specie="Humano"))
+        db.session.commit()
+    assert catalog.snapshots == {} and catalog._refresher is None
+    assert second.test_client().get("/people/1").get_json()["name"] == "Leia"
+    # El hilo de la primera app termina en vez de seguir refrescando
+    refresher.join(timeout=5)
+    assert not refresher.is_alive()
@@ -0,0 +1,65 @@
+import pytest
+from models import favorite_count
+from conftest import make_app, auth_headers
+
+# Los contadores de favorite_counters siguen a las altas y bajas de favoritos,
+# individuales y por batch, y desaparecen con el item borrado
+
+
+@pytest.fixture
+def client():
+    client = make_app().test_client()
+    client.post("/people/batch", json=[{"name": "Luke", "specie": "Humano"}, {"name": "Leia", "specie": "Humano"}])
+    client.post("/planets/batch", json=[{"name": "Tatooine"}])
+    return client
+
+
+def count(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.json.get("favorites_count", response.json.get("count"))
+
+
+def test_counters_follow_adds_and_removes(client):
+    first, second = auth_headers(client.application, "a@test.local"), auth_headers(client.application, "b@test.local")
+    assert client.post("/favorite/people/1", headers=first).status_code == 201
+    assert client.post("/favorite/batch", headers=second, json=[{"id_character": 1}, {"id_planet": 1}]).status_code == 201
+    assert count(client, "/people/1/stats") == 2
+    assert count(client, "/users/2/favorites/count") == 2
+
+    # Un duplicado no cuenta
+    assert client.post("/favorite/people/1", headers=first).status_code == 409
+    assert count(client, "/people/1/stats") == 2
+
+    assert client.delete("/favorite/people/1", headers=first).status_code == 200
+    assert client.delete("/favorite/batch", headers=second, json=[{"id_planet": 1}]).status_code == 200
+    assert count(client, "/people/1/stats") == 1
+    assert count(client, "/users/1/favorites/count") == 0
+    assert count(client, "/users/2/favorites/count") == 1
+
+
+def test_top_orders_by_count(client):
+    for email in ("a@test.local", "b@test.local"):
+        client.post("/favorite/people/2", headers=auth_headers(client.application, email))
+    client.post("/favorite/people/1", headers=auth_headers(client.application, "a@test.local"))
+    top = client.get("/people/top?limit=2").json
+    assert [(row["id"], row["favorites_count"]) for row in top] == [(2, 2), (1, 1)]
+    assert client.get("/people/top?limit=0").status_code == 400
+
+
+def test_deleted_item_loses_its_counter(client):
+    headers = auth_headers(client.application)
+    client.post("/favorite/people/1", headers=headers)
+    client.post("/favorite/people/2", headers=headers)
+    assert client.delete("/people/1").status_code == 200
+    assert client.delete("/people/batch", json=[2]).status_code == 200
+    assert client.get("/people/1/stats").status_code == 404
+    with client.application.app_context():
+        assert favorite_count("character", 1) is None
+        assert favorite_count("character", 2) is None
+        assert favorite_count("user", 1) == 2
+
+
+def test_stats_of_missing_item_is_404(client):
+    assert client.get("/people/99/stats").status_code == 404
+    assert client.get("/users/99/favorites/count").status_code == 404
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event
+from models import db, User, Character, Planet, Favorites
+from conftest import make_app
+
+# Los listados cargan el grafo users -> favorites -> character/planet con un numero
+# fijo de queries: el mismo con 3 usuarios que con 30. Si alguien vuelve a hacer lazy
+# load por fila el numero crece con los datos y este test falla.
+
+PATHS = ("/users", "/favorite", "/users/1/favorites")
+
+
+def make_client(users):
+    app = make_app(CACHE_ENABLED=False, FAVORITES_CACHE_ENABLED=False)
+    with app.app_context():
+        characters = [Character(name=f"Character {i}", specie="Human") for i in range(users)]
+        planets = [Planet(name=f"Planet {i}") for i in range(users)]
+        db.session.add_all(characters + planets)
+        for i in range(users):
+            user = User(name=f"User {i}", email=f"user{i}@test.local", password="x")
+            db.session.add(user)
+            # Cada usuario tiene favoritos de los dos tipos para que se carguen ambas relaciones
+            for item in (characters[i], characters[(i + 1) % users]):
+                db.session.add(Favorites(user=user, character=item, name=item.name, tipo="character"))
+            db.session.add(Favorites(user=user, planet=planets[i], name=planets[i].name, tipo="planet"))
+        db.session.commit()
+        engine = db.engine
+    return app.test_client(), engine
+
+
+def count_queries(client, engine, path):
+    queries = []
+
+    def count(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(queries)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_query_count_does_not_grow_with_rows(path):
+    small = count_queries(*make_client(3), path)
+    large = count_queries(*make_client(30), path)
+    assert small == large
@@ -0,0 +1,49 @@
+from conftest import make_app, auth_headers
+
+# Token bucket por endpoint y cliente (usuario del JWT o IP)
+
+LIMITS = {
+    "RATELIMIT_ENABLED": True,
+    "RATELIMIT_ROUTES": {"api.login": "2/minute"},
+    "RATELIMIT_LOGIN_PER_EMAIL": "3/minute",
+    "RATELIMIT_WRITES": "1/minute",
+}
+
+
+def login(client, email, ip):
+    return client.post("/login", json={"email": email, "password": "x"}, environ_base={"REMOTE_ADDR": ip})
+
+
+def test_route_limit_per_ip():
+    client = make_app(**LIMITS).test_client()
+    assert [login(client, "a@test.local", "10.0.0.1").status_code for _ in range(2)] == [401, 401]
+    rejected = login(client, "a@test.local", "10.0.0.1")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    # Otra IP tiene su propio bucket
+    assert login(client, "b@test.local", "10.0.0.2").status_code == 401
+
+
+def test_login_limit_per_email_across_ips():
+    client = make_app(**LIMITS).test_client()
+    assert [login(client, "A@test.local ", f"10.0.0.{i}").status_code for i in range(3)] == [401] * 3
+    assert login(client, "a@test.local", "10.0.0.9").status_code == 429
+
+
+def test_writes_limited_per_jwt_user():
+    app = make_app(**LIMITS)
+    client = app.test_client()
+    first, second = auth_headers(app, "a@test.local"), auth_headers(app, "b@test.local")
+    client.post("/people/batch", json=[{"name": "Luke", "specie": "Humano"}, {"name": "Leia", "specie": "Humano"}])
+    # Misma IP, distinto usuario: cada uno tiene su bucket de escrituras por endpoint
+    assert client.post("/favorite/people/1", headers=first).status_code == 201
+    assert client.post("/favorite/people/1", headers=second).status_code == 201
+    assert client.post("/favorite/people/2", headers=first).status_code == 429
+    assert client.delete("/favorite/people/1", headers=first).status_code == 200
+    # Las lecturas no cuentan
+    assert client.get("/people/1", headers=first).status_code == 200
+
+
+def test_disabled_does_not_limit():
+    client = make_app(**{**LIMITS, "RATELIMIT_ENABLED": False}).test_client()
+    assert {login(client, "a@test.local", "10.0.0.1").status_code for _ in range(5)} == {401}
@@ -0,0 +1,60 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from models import db, User, Character
+from replicas import replicas
+from conftest import make_app
+
+# La replica es otra base de datos sqlite con un nombre distinto para el mismo
+# character: la respuesta dice de donde salio la lectura.
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # Sin hilo de salud: los tests marcan el estado de la replica con check_all()
+    monkeypatch.setattr(replicas, "start", lambda app: None)
+    app = make_app(SQLALCHEMY_REPLICA_URIS=["sqlite://"], CACHE_ENABLED=False, REPLICA_MAX_LAG=5)
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica_0"])
+        db.session.add_all([Character(name="Primary", specie="Human"),
+                            User(name="u", email="u@test.local", password="x")])
+        db.session.commit()
+        with db.engines["replica_0"].begin() as conn:
+            conn.execute(Character.__table__.insert(), {"name": "Replica", "specie": "Human"})
+        replicas.check_all()
+    return app
+
+
+def read_from(client, **kwargs):
+    return client.get("/people/1", **kwargs).json["name"]
+
+
+def token(app):
+    with app.app_context():
+        return {"Authorization": "Bearer " + create_access_token(identity="u@test.local")}
+
+
+def test_reads_go_to_a_replica_within_max_lag(app):
+    assert read_from(app.test_client()) == "Replica"
+
+
+def test_replica_behind_max_lag_is_skipped(app):
+    replicas.replicas[0].lag = 30
+    assert read_from(app.test_client()) == "Primary"
+    replicas.replicas[0].lag = 1
+    assert read_from(app.test_client()) == "Replica"
+
+
+def test_write_pins_only_the_writing_session(app):
+    writer, other = app.test_client(), app.test_client()
+    assert writer.post("/people", json={"name": "Han", "specie": "Human"}).status_code == 201
+    assert read_from(writer) == "Primary"
+    # Misma IP (127.0.0.1) y mismo worker, pero otra sesion: sigue leyendo de la replica
+    assert read_from(other) == "Replica"
+
+
+def test_write_pins_the_jwt_subject_without_cookies(app):
+    headers = token(app)
+    writer = app.test_client(use_cookies=False)
+    assert writer.post("/favorite/people/1", headers=headers).status_code == 201
+    assert read_from(writer, headers=headers) == "Primary"
+    assert read_from(writer) == "Replica"
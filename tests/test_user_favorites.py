@@ -0,0 +1,55 @@
+from cache import UserFavoritesCache, LRUCache
+
+
+def make_cache(max_users=10):
+    favorites = UserFavoritesCache()
+    favorites.backend = LRUCache(max_users)
+    return favorites
+
+
+def load(favorites, id_user, during=None):
+    # Carga con una invalidacion opcional entre generation() y store(), como una
+    # escritura concurrente mientras se lee la base de datos
+    generation = favorites.generation(id_user)
+    if during is not None:
+        during()
+    favorites.store(id_user, generation, [{"id": 1}], [("planet", 1)], "v1")
+    return favorites.peek(id_user)
+
+
+def test_store_and_invalidate():
+    favorites = make_cache()
+    assert load(favorites, 1).keys == {("planet", 1)}
+    favorites.invalidate(1)
+    assert favorites.peek(1) is None
+    assert load(favorites, 1) is not None
+
+
+def test_invalidation_during_load_discards_entry():
+    favorites = make_cache()
+    assert load(favorites, 1, lambda: favorites.invalidate(1)) is None
+    # Una escritura de otro usuario no afecta
+    assert load(favorites, 1, lambda: favorites.invalidate(2)) is not None
+
+
+def test_clear_discards_loads_of_unknown_users():
+    favorites = make_cache()
+    assert load(favorites, 7, favorites.clear) is None
+
+
+def test_state_is_bounded_by_max_users():
+    favorites = make_cache(max_users=10)
+    for id_user in range(1000):
+        favorites.invalidate(id_user)
+    assert len(favorites.backend) == 10
+
+
+def test_evicted_invalidation_still_discards_load():
+    favorites = make_cache(max_users=2)
+
+    def invalidate_then_evict():
+        favorites.invalidate(1)
+        favorites.invalidate(2)
+        favorites.invalidate(3)
+
+    assert load(favorites, 1, invalidate_then_evict) is None